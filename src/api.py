@@ -0,0 +1,258 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import json
+import logging
+from collections import deque
+
+from gi.repository import Gio, GLib
+
+from .config_manager import ConfigManager
+from .transcription import TranscriptionClient, TranscriptionError
+from .vocabulary import Vocabulary
+from .long_recording import PARTIAL_SEGMENT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Longest request line accepted from a client; longer ones close the connection
+MAX_LINE = 64 * 1024
+READ_SIZE = 4096
+
+
+def get_socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or GLib.get_user_runtime_dir()
+    return os.path.join(runtime_dir, "whis", "api.sock")
+
+
+class ApiConnection:
+    """
+    One keep-alive client connection speaking newline-delimited JSON.
+
+    Requests look like {"id": 1, "command": "start"} and are answered with
+    {"id": 1, "ok": true, ...}. Dictations started on a connection stream
+    {"event": "level" | "partial" | "state" | "final", ...} back to it, and
+    only those can be stopped or cancelled from it. Every dictation ends
+    with a final event, whose error is set if it failed or was cancelled.
+    """
+
+    def __init__(self, server, connection):
+        self.server = server
+        self.connection = connection
+        self.cancellable = Gio.Cancellable()
+        self.input = connection.get_input_stream()
+        self.output = connection.get_output_stream()
+        # Lines are split here rather than by Gio.DataInputStream, which
+        # would buffer a line of any length before MAX_LINE could be checked
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.writing = False
+        self.closing = False
+        self.closed = False
+        # job -> [(object, handler id)] for the unsettled jobs started here
+        self.jobs = {}
+        self.read_next()
+
+    def read_next(self):
+        self.input.read_bytes_async(READ_SIZE, GLib.PRIORITY_DEFAULT, self.cancellable, self.on_read)
+
+    def on_read(self, stream, result):
+        try:
+            data = stream.read_bytes_finish(result).get_data()
+        except GLib.Error as e:
+            if not e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                logger.debug(f"API client read failed: {e.message}")
+            self.close()
+            return
+        if not data:
+            self.close()
+            return
+        self.buffer += data
+        while not self.closing and not self.closed:
+            end = self.buffer.find(b"\n")
+            if end == -1:
+                break
+            line = bytes(self.buffer[:end])
+            del self.buffer[:end + 1]
+            if line.strip():
+                self.handle(line)
+        if len(self.buffer) > MAX_LINE:
+            self.send({"ok": False, "error": "request too long"})
+            self.finish()
+        if not self.closing and not self.closed:
+            self.read_next()
+
+    def handle(self, line):
+        try:
+            request = json.loads(line)
+            command = request["command"]
+        except (ValueError, TypeError, KeyError):
+            self.send({"ok": False, "error": "expected a JSON object with a command"})
+            return
+        handler = getattr(self, f"do_{command}", None) if isinstance(command, str) else None
+        response = handler(request) if handler is not None else {"ok": False, "error": f"unknown command {command!r}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        self.send(response)
+
+    def do_start(self, request):
+        dictation = self.server.app.dictation
+        if dictation.is_recording():
+            return {"ok": False, "error": "a dictation is already recording"}
+        try:
+            client = TranscriptionClient.from_config(ConfigManager.get_default().get_settings().transcription)
+        except TranscriptionError as e:
+            return {"ok": False, "error": str(e)}
+        # Short segments so partial text streams while the user speaks
+        job = dictation.start(client, self.server.app.gio_settings.get_string("audio-device"),
+                              on_ready=lambda text, latency: self.on_final(job, text, latency),
+                              segment_target=PARTIAL_SEGMENT_SECONDS)
+        self.jobs[job] = [
+            (job, job.connect("notify::state", self.on_job_state)),
+            (job.recorder, job.recorder.connect("level", self.on_job_level, job)),
+            (job.recorder, job.recorder.connect("partial", self.on_job_partial, job)),
+        ]
+        return {"ok": True, "job": job.number}
+
+    def get_own_recording(self):
+        job = self.server.app.dictation.get_recording()
+        return job if job in self.jobs else None
+
+    def do_stop(self, request):
+        if self.get_own_recording() is None:
+            return {"ok": False, "error": "no dictation started here is recording"}
+        self.server.app.dictation.stop()
+        return {"ok": True}
+
+    def do_cancel(self, request):
+        if self.get_own_recording() is None:
+            return {"ok": False, "error": "no dictation started here is recording"}
+        self.server.app.dictation.cancel()
+        return {"ok": True}
+
+    def do_status(self, request):
+        dictation = self.server.app.dictation
+        return {"ok": True, "recording": dictation.is_recording(),
+                "jobs": [{"job": job.number, "state": job.state, "own": job in self.jobs} for job in dictation.jobs]}
+
+    def on_job_state(self, job, pspec):
+        self.send({"event": "state", "job": job.number, "state": job.state})
+
+    def on_job_level(self, recorder, level, job):
+        self.send({"event": "level", "job": job.number, "db": round(level, 1)})
+
+    def on_job_partial(self, recorder, text, job):
+        self.send({"event": "partial", "job": job.number, "text": Vocabulary.get_default().apply(text)})
+
+    def on_final(self, job, text, latency):
+        self.disconnect_job(job)
+        if text:
+            text = Vocabulary.get_default().apply(text)
+            self.server.app.record_transcript(text, latency, source="api")
+        if self.closed:
+            logger.info(f"API client left before dictation {job.number} finished")
+            return
+        error = job.error if job.state == "failed" else "cancelled" if job.state == "cancelled" else None
+        self.send({"event": "final", "job": job.number, "state": job.state, "text": text,
+                   "latency": round(latency, 3), "error": error})
+
+    def disconnect_job(self, job):
+        for obj, handler in self.jobs.pop(job, ()):
+            obj.disconnect(handler)
+
+    def send(self, message):
+        if self.closing or self.closed:
+            return
+        self.pending.append((json.dumps(message, ensure_ascii=False) + "\n").encode())
+        if not self.writing:
+            self.write_next()
+
+    def write_next(self):
+        if self.closed:
+            return
+        if not self.pending:
+            self.writing = False
+            if self.closing:
+                self.close()
+            return
+        self.writing = True
+        self.output.write_all_async(self.pending.popleft(), GLib.PRIORITY_DEFAULT, self.cancellable, self.on_written)
+
+    def on_written(self, stream, result):
+        try:
+            stream.write_all_finish(result)
+        except GLib.Error as e:
+            logger.debug(f"API client write failed: {e.message}")
+            self.close()
+            return
+        self.write_next()
+
+    def finish(self):
+        """Closes the connection once queued messages are written."""
+        self.closing = True
+        if not self.writing:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.cancellable.cancel()
+        for job in list(self.jobs):
+            self.disconnect_job(job)
+        self.pending.clear()
+        self.connection.close_async(GLib.PRIORITY_DEFAULT, None, None)
+        self.server.connections.discard(self)
+
+
+class DictationServer:
+    """
+    Opt-in local dictation API on a Unix socket only the user can open.
+
+    Gio.SocketService accepts connections and all reads and writes are
+    asynchronous on the application's main loop, so no thread or process
+    is spawned per client or request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.path = get_socket_path()
+        self.service = None
+        self.connections = set()
+
+    def start(self):
+        if self.service is not None:
+            return
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.service = Gio.SocketService.new()
+        try:
+            self.service.add_address(Gio.UnixSocketAddress.new(self.path), Gio.SocketType.STREAM,
+                                     Gio.SocketProtocol.DEFAULT, None)
+        except GLib.Error as e:
+            logger.error(f"Failed to listen on {self.path}: {e.message}")
+            self.service = None
+            return
+        os.chmod(self.path, 0o600)
+        self.service.connect("incoming", self.on_incoming)
+        self.service.start()
+        logger.info(f"Dictation API listening on {self.path}")
+
+    def stop(self):
+        if self.service is None:
+            return
+        self.service.stop()
+        self.service.close()
+        self.service = None
+        for connection in list(self.connections):
+            connection.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        logger.info("Dictation API stopped")
+
+    def on_incoming(self, service, connection, source_object):
+        self.connections.add(ApiConnection(self, connection))
+        return True
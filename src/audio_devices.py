@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import logging
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib, GObject
+
+logger = logging.getLogger(__name__)
+
+# Device properties that stay stable across reconnects, most specific first
+_ID_PROPERTIES = ("node.name", "object.path", "device.bus_path", "udev.id")
+
+
+def get_device_id(device):
+    props = device.get_properties()
+    if props is not None:
+        for key in _ID_PROPERTIES:
+            if props.has_field(key):
+                return str(props.get_value(key))
+    return device.get_display_name()
+
+
+class AudioDeviceMonitor(GObject.Object):
+    """
+    Cached list of audio input devices kept current by Gst.DeviceMonitor events.
+    """
+
+    __gtype_name__ = "AudioDeviceMonitor"
+
+    __gsignals__ = {
+        'devices-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+    }
+
+    _default = None
+
+    def __init__(self):
+        super().__init__()
+        self.devices = []
+        self.monitor = Gst.DeviceMonitor.new()
+        self.monitor.add_filter("Audio/Source", None)
+        self.bus_watch = self.monitor.get_bus().add_watch(GLib.PRIORITY_DEFAULT, self.on_bus_message)
+        if self.monitor.start():
+            self.devices = list(self.monitor.get_devices() or [])
+        else:
+            logger.error("Failed to start audio device monitor")
+
+    @classmethod
+    def get_default(cls):
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def on_bus_message(self, bus, message):
+        if message.type == Gst.MessageType.DEVICE_ADDED:
+            self.devices.append(message.parse_device_added())
+        elif message.type == Gst.MessageType.DEVICE_REMOVED:
+            removed = message.parse_device_removed()
+            self.devices = [d for d in self.devices if d != removed]
+        elif message.type == Gst.MessageType.DEVICE_CHANGED:
+            device, changed = message.parse_device_changed()
+            self.devices = [device if d == changed else d for d in self.devices]
+        else:
+            return True
+        self.emit("devices-changed")
+        return True
+
+    def get_devices(self):
+        """Returns [(device id, display name)] for the cached devices."""
+        return [(get_device_id(d), d.get_display_name()) for d in self.devices]
+
+    def find(self, device_id):
+        for device in self.devices:
+            if get_device_id(device) == device_id:
+                return device
+        return None
+
+    def create_source(self, device_id):
+        """Creates a source element for device_id, or the system default."""
+        device = self.find(device_id) if device_id else None
+        if device is not None:
+            element = device.create_element(None)
+            if element is not None:
+                return element
+            logger.error(f"Failed to create source for {device_id}, using default")
+        return Gst.ElementFactory.make("autoaudiosrc", None)
+
+    def stop(self):
+        self.monitor.stop()
+        GLib.source_remove(self.bus_watch)
+        AudioDeviceMonitor._default = None
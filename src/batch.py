@@ -0,0 +1,341 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from .history import HistoryStore
+from .gst_utils import EncodeError, UPLOAD_SUFFIX, get_encode_timeout, make_upload_elements
+from .transcription import TranscriptionError, TranscriptionResult
+from .scheduler import PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+BATCH_FLAGS = ("--transcribe", "--transcribe-dir")
+FORMATS = ("jsonl", "srt")
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".oga", ".flac", ".webm", ".amr", ".3gp", ".mp4")
+
+DEFAULT_JOBS = 4
+# Files decoded ahead of the upload slots so uploads never wait on decoding
+DECODE_AHEAD = 2
+# Upload limit of both providers
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+# Long files are uploaded in parts of this length, about 2 MB each, so
+# hour-long recordings stay far below the upload limit and request timeout
+PART_SECONDS = 600
+
+STATE_NAME = ".whis-batch-state"
+
+
+class BatchError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class BatchOptions:
+    files: list
+    output: str
+    format: str = "jsonl"
+    jobs: int = DEFAULT_JOBS
+
+    @property
+    def state_path(self):
+        if self.format == "srt":
+            return os.path.join(self.output, STATE_NAME)
+        return f"{self.output}.state"
+
+
+def is_batch_invocation(args):
+    return any(arg in BATCH_FLAGS for arg in args)
+
+
+def parse_batch_args(args, cwd):
+    """Parses the batch flags out of a whis command line into BatchOptions."""
+    parser = argparse.ArgumentParser(prog="whis", add_help=False, exit_on_error=False)
+    parser.add_argument("--transcribe", nargs="+", action="extend", default=[])
+    parser.add_argument("--transcribe-dir", action="append", default=[])
+    parser.add_argument("--output")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    try:
+        parsed, _ = parser.parse_known_args(args)
+    except (argparse.ArgumentError, SystemExit) as e:
+        raise BatchError(f"Invalid batch arguments: {e}") from e
+
+    if parsed.jobs < 1:
+        raise BatchError("--jobs must be at least 1")
+
+    files = [os.path.join(cwd, f) for f in parsed.transcribe]
+    for directory in parsed.transcribe_dir:
+        directory = os.path.join(cwd, directory)
+        if not os.path.isdir(directory):
+            raise BatchError(f"Not a directory: {directory}")
+        for root, dirs, names in os.walk(directory):
+            dirs.sort()
+            files += [os.path.join(root, n) for n in sorted(names) if n.lower().endswith(AUDIO_EXTENSIONS)]
+
+    files = list(dict.fromkeys(os.path.normpath(f) for f in files))
+    missing = [f for f in files if not os.path.isfile(f)]
+    if missing:
+        raise BatchError(f"File not found: {missing[0]}")
+    if not files:
+        raise BatchError("No audio files to transcribe")
+
+    default_output = cwd if parsed.format == "srt" else "transcripts.jsonl"
+    output = os.path.join(cwd, parsed.output or default_output)
+    return BatchOptions(files, output, parsed.format, parsed.jobs)
+
+
+def get_srt_names(files):
+    """
+    Maps each file to its SRT path relative to the output directory.
+
+    The input tree is mirrored below the files' common directory, so
+    a/x.wav and b/x.wav do not overwrite each other; files differing only
+    in extension keep it, as in x.wav.srt and x.mp3.srt.
+    """
+    base = os.path.commonpath([os.path.dirname(f) for f in files])
+    relative = {f: os.path.relpath(f, base) for f in files}
+    stems = {f: os.path.splitext(r)[0] for f, r in relative.items()}
+    counts = Counter(stems.values())
+    return {f: (stems[f] if counts[stems[f]] == 1 else relative[f]) + ".srt" for f in files}
+
+
+def decode_audio(path, directory):
+    """
+    Decodes any GStreamer-supported file to 16 kHz mono Ogg Opus parts of
+    at most PART_SECONDS in directory. Blocks until done or timed out, so
+    call it from a worker thread. Returns ([(part path, start seconds)], duration in seconds).
+    """
+    pipeline = Gst.Pipeline.new(None)
+    elements = [Gst.ElementFactory.make(name, None) for name in
+                ("filesrc", "decodebin", "audioconvert", "audioresample", "splitmuxsink")]
+    if None in elements:
+        raise BatchError("Missing GStreamer elements for decoding")
+    src, decode, convert, resample, sink = elements
+    capsfilter, encoder, muxer = make_upload_elements()
+
+    src.set_property("location", path)
+    sink.set_property("muxer", muxer)
+    sink.set_property("max-size-time", PART_SECONDS * Gst.SECOND)
+    for element in elements + [capsfilter, encoder]:
+        pipeline.add(element)
+    src.link(decode)
+    convert.link(resample)
+    resample.link(capsfilter)
+    capsfilter.link(encoder)
+    encoder.get_static_pad("src").link(sink.request_pad_simple("audio_%u"))
+
+    parts = []
+
+    def on_format_location(splitmux, fragment_id, first_sample):
+        # Runs on the streaming thread as each part is opened
+        location = os.path.join(directory, f"part-{fragment_id:04}{UPLOAD_SUFFIX}")
+        pts = first_sample.get_buffer().pts
+        parts.append((location, pts / Gst.SECOND if pts != Gst.CLOCK_TIME_NONE else fragment_id * PART_SECONDS))
+        return location
+
+    sink.connect("format-location-full", on_format_location)
+
+    def on_pad_added(decodebin, pad):
+        caps = pad.get_current_caps() or pad.query_caps(None)
+        sink_pad = convert.get_static_pad("sink")
+        if caps.to_string().startswith("audio/") and not sink_pad.is_linked():
+            pad.link(sink_pad)
+
+    decode.connect("pad-added", on_pad_added)
+
+    pipeline.set_state(Gst.State.PLAYING)
+    bus = pipeline.get_bus()
+    start = time.monotonic()
+    timeout = get_encode_timeout()
+    while True:
+        message = bus.timed_pop_filtered(Gst.SECOND, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+        if message is not None:
+            break
+        # The duration is known once decodebin has found the stream
+        known, length = pipeline.query_duration(Gst.Format.TIME)
+        if known and length > 0:
+            timeout = get_encode_timeout(length / Gst.SECOND)
+        if time.monotonic() - start > timeout:
+            break
+    ok, position = pipeline.query_position(Gst.Format.TIME)
+    pipeline.set_state(Gst.State.NULL)
+
+    if message is None:
+        raise BatchError(f"Decoding {path} timed out after {timeout:.0f}s")
+    if message.type == Gst.MessageType.ERROR:
+        raise BatchError(f"Failed to decode {path}: {message.parse_error()[0].message}")
+    if not parts:
+        raise BatchError(f"No audio in {path}")
+    return parts, position / Gst.SECOND if ok else None
+
+
+def merge_results(results):
+    """Joins the results of consecutive parts, given as [(start seconds, TranscriptionResult)]."""
+    if len(results) == 1:
+        return results[0][1]
+    segments = []
+    for offset, result in results:
+        segments += [{**s, "start": s["start"] + offset, "end": s["end"] + offset} for s in result.segments]
+    last_offset, last = results[-1]
+    duration = last_offset + last.duration if last.duration is not None else None
+    text = " ".join(result.text for _, result in results if result.text)
+    return TranscriptionResult(text, segments, duration, last.headers)
+
+
+def format_srt_time(seconds):
+    ms = round(seconds * 1000)
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{ms:03}"
+
+
+def format_srt(result, duration=None):
+    segments = result.segments or [{"start": 0.0, "end": duration or result.duration or 0.0, "text": result.text}]
+    return "\n".join(f"{i}\n{format_srt_time(s['start'])} --> {format_srt_time(s['end'])}\n{s['text']}\n"
+                     for i, s in enumerate(segments, 1))
+
+
+class BatchTranscriber:
+    """
+    Transcribes a list of files with the configured provider.
+
+    Files are decoded by a small thread pool (GStreamer does the work in its
+    own streaming threads), while a semaphore caps concurrent uploads at
+    `jobs`. Every finished file is appended to a state file next to the
+    output, so a rerun with the same arguments skips what was already done.
+    """
+
+    def __init__(self, options, client, report=None):
+        self.options = options
+        self.client = client
+        self.report = report or logger.info
+        self.uploads = threading.Semaphore(options.jobs)
+        self.srt_names = get_srt_names(options.files) if options.format == "srt" else {}
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.executor = None
+        self.completed = 0
+        self.failed = 0
+        self.total = 0
+
+    @staticmethod
+    def get_key(path):
+        stat = os.stat(path)
+        return f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}"
+
+    def load_state(self):
+        try:
+            with open(self.options.state_path) as f:
+                # A crash can leave a partial last line; it is simply retried
+                return {line.rstrip("\n") for line in f if line.endswith("\n")}
+        except FileNotFoundError:
+            return set()
+
+    def run(self):
+        """Runs the batch to completion and returns the exit status."""
+        if self.options.format == "srt":
+            os.makedirs(self.options.output, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(self.options.output), exist_ok=True)
+
+        done = self.load_state()
+        pending = [f for f in self.options.files if self.get_key(f) not in done]
+        skipped = len(self.options.files) - len(pending)
+        self.total = len(pending)
+        if skipped:
+            self.report(f"Skipping {skipped} file(s) already transcribed")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options.jobs + DECODE_AHEAD, thread_name_prefix="whis-batch") as executor:
+            self.executor = executor
+            for path in pending:
+                executor.submit(self.process, path)
+        self.executor = None
+
+        self.report(f"Transcribed {self.completed}, failed {self.failed}, skipped {skipped} "
+                    f"in {time.perf_counter() - start:.1f}s")
+        return 1 if self.failed or self.cancelled.is_set() else 0
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def process(self, path):
+        if self.cancelled.is_set():
+            return
+        start = time.perf_counter()
+        try:
+            key = self.get_key(path)
+            with tempfile.TemporaryDirectory(prefix="whis-batch-") as tmp:
+                parts, duration = decode_audio(path, tmp)
+                results = []
+                for i, (part, offset) in enumerate(parts):
+                    if os.path.getsize(part) > MAX_UPLOAD_BYTES:
+                        raise BatchError(f"Part {i} of {path} is larger than the {MAX_UPLOAD_BYTES // 2**20} MB upload limit")
+                    end = parts[i + 1][1] if i + 1 < len(parts) else duration
+                    with self.uploads:
+                        if self.cancelled.is_set():
+                            return
+                        result = self.client.transcribe(part, PRIORITY_BATCH, end - offset if end is not None else None)
+                    results.append((offset, result))
+                result = merge_results(results)
+        except Exception as e:
+            # Anything raised here would otherwise vanish inside the future
+            if not isinstance(e, (BatchError, EncodeError, TranscriptionError, OSError)):
+                logger.exception(f"Unexpected error transcribing {path}")
+            with self.lock:
+                self.failed += 1
+                index = self.completed + self.failed
+            self.report(f"[{index}/{self.total}] Failed {path}: {e}")
+            return
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.write_result(path, result, duration)
+            with open(self.options.state_path, "a") as f:
+                f.write(key + "\n")
+            self.completed += 1
+            index = self.completed + self.failed
+        try:
+            HistoryStore.get_default().add(result.text, self.client.provider, self.client.model, elapsed, source="batch")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record transcript: {e}")
+        self.report(f"[{index}/{self.total}] {path} ({duration or 0:.0f}s audio in {elapsed:.1f}s)")
+
+    def write_result(self, path, result, duration):
+        if self.options.format == "srt":
+            destination = os.path.join(self.options.output, self.srt_names[path])
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            tmp = f"{destination}.tmp"
+            with open(tmp, "w") as f:
+                f.write(format_srt(result, duration))
+            os.replace(tmp, destination)
+            return
+
+        record = {
+            "file": path,
+            "text": result.text,
+            "duration": duration or result.duration,
+            "provider": self.client.provider,
+            "model": self.client.model,
+            "segments": result.segments,
+        }
+        with open(self.options.output, "a") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -1,25 +1,123 @@
 import os
 import tomllib
 import logging
+from types import MappingProxyType
+
+from gi.repository import Gio, GLib, GObject
+
 from .logging_utils import log_function_calls
+from .toml_document import TomlDocument
+from .config_schema import WhisConfig
+
+logger = logging.getLogger(__name__)
+
+
+def _freeze(value):
+    """Recursively converts parsed TOML into read-only mappings and tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+_EMPTY = _freeze({})
+
+
+class ConfigManager(GObject.Object):
+    """
+    Process-wide access to hyprvoice's config.toml.
+
+    The file is parsed once and kept as an immutable snapshot. A Gio.FileMonitor
+    drops the snapshot when the file is edited by the daemon or the user and
+    'changed' is emitted so open windows can refresh. Writes made through
+    save_config bump `version` and emit 'saved' with it.
+    """
+
+    __gtype_name__ = "ConfigManager"
+
+    __gsignals__ = {
+        'changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+        'saved': (GObject.SignalFlags.RUN_FIRST, None, (int,)),
+    }
+
+    _default = None
 
-class ConfigManager:
     def __init__(self):
-        self.config_path = os.path.join(os.environ.get("XDG_CONFIG_HOME"), "hyprvoice", "config.toml")
-        logging.debug(f"ConfigManager initialized with path: {self.config_path}")
+        super().__init__()
+        config_home = os.environ.get("XDG_CONFIG_HOME") or GLib.get_user_config_dir()
+        self.config_path = os.path.join(config_home, "hyprvoice", "config.toml")
+        self._snapshot = None
+        self._settings = None
+        self._monitor = None
+        self.version = 0
+        logger.debug(f"ConfigManager initialized with path: {self.config_path}")
+
+    @classmethod
+    def get_default(cls):
+        """Returns the shared instance, creating and monitoring it on first use."""
+        if cls._default is None:
+            cls._default = cls()
+            cls._default.start_monitor()
+        return cls._default
+
+    def start_monitor(self):
+        if self._monitor is not None:
+            return
+        try:
+            gfile = Gio.File.new_for_path(self.config_path)
+            self._monitor = gfile.monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, None)
+            self._monitor.connect("changed", self.on_file_changed)
+        except GLib.Error as e:
+            logger.error(f"Failed to monitor config: {e}")
+
+    def on_file_changed(self, monitor, file, other_file, event_type):
+        if event_type not in (Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                              Gio.FileMonitorEvent.CREATED,
+                              Gio.FileMonitorEvent.DELETED,
+                              Gio.FileMonitorEvent.MOVED_IN,
+                              Gio.FileMonitorEvent.RENAMED):
+            return
+        self.refresh()
+
+    def refresh(self):
+        """Re-reads the file and notifies subscribers if the content changed."""
+        previous = self._snapshot
+        self._snapshot = None
+        self._settings = None
+        if self.get_config() != previous:
+            logger.debug("Config changed on disk, notifying subscribers.")
+            self.emit("changed")
 
-    @log_function_calls
     def get_config(self):
+        if self._snapshot is None:
+            self._snapshot = self._load()
+        return self._snapshot
+
+    def get_settings(self):
+        """Returns the cached snapshot as a typed WhisConfig."""
+        if self._settings is None:
+            self._settings = WhisConfig.from_mapping(self.get_config())
+        return self._settings
+
+    def save_settings(self, settings):
+        """Persists only the keys that differ from the cached snapshot."""
+        updates = self.get_settings().diff(settings)
+        if updates:
+            self.save_config(updates)
+        return updates
+
+    @log_function_calls
+    def _load(self):
         if not os.path.exists(self.config_path):
-            return {}
-        
+            return _EMPTY
+
         try:
             with open(self.config_path, "rb") as f:
-                data = tomllib.load(f) # Changed 'return data' to 'data = tomllib.load(f)' to match user's snippet
-                return data
+                return _freeze(tomllib.load(f))
         except Exception as e:
-            logging.error(f"Error loading config: {e}")
-            return {}
+            logger.error(f"Error loading config: {e}")
+            return _EMPTY
 
     @log_function_calls
     def save_config(self, updates):
@@ -33,78 +131,29 @@ class ConfigManager:
         }
         """
         if not os.path.exists(self.config_path):
-            logging.error(f"Config file not found at {self.config_path}, cannot update.")
+            logger.error(f"Config file not found at {self.config_path}, cannot update.")
             return
 
         try:
             with open(self.config_path, "r") as f:
-                lines = f.readlines()
-
-            new_lines = []
-            current_section = None
-            processed_updates = {sec: set() for sec in updates}
-            
-            for line in lines:
-                original_line = line
-                stripped = line.strip()
-                
-                if stripped.startswith("[") and stripped.endswith("]"):
-                    # Before switching section, check if we missed any keys in the previous one
-                    if current_section in updates:
-                        for key, val in updates[current_section].items():
-                            if key not in processed_updates[current_section]:
-                                val_str = self._format_val(val)
-                                new_lines.append(f"{key} = {val_str}\n")
-                                processed_updates[current_section].add(key)
-
-                    current_section = stripped[1:-1]
-                    new_lines.append(line)
-                    continue
-                
-                updated_line = False
-                if current_section and current_section in updates:
-                    section_updates = updates[current_section]
-                    for key, val in section_updates.items():
-                        if stripped.startswith(f"{key} =") or stripped.startswith(f"{key}="):
-                            val_str = self._format_val(val)
-                            comment = line[line.find("#"):] if "#" in line else "\n"
-                            new_lines.append(f"{key} = {val_str}{comment}")
-                            processed_updates[current_section].add(key)
-                            updated_line = True
-                            break
-                
-                if not updated_line:
-                    new_lines.append(line)
-
-            # Check for remaining keys in the last section
-            if current_section in updates:
-                for key, val in updates[current_section].items():
-                    if key not in processed_updates[current_section]:
-                        val_str = self._format_val(val)
-                        new_lines.append(f"{key} = {val_str}\n")
-                        processed_updates[current_section].add(key)
-
-            # Add completely new sections
-            for section, section_updates in updates.items():
-                if section not in processed_updates or not any(line.strip() == f"[{section}]" for line in lines):
-                    if section not in [l.strip()[1:-1] for l in lines if l.strip().startswith("[")]:
-                        new_lines.append(f"\n[{section}]\n")
-                        for key, val in section_updates.items():
-                            val_str = self._format_val(val)
-                            new_lines.append(f"  {key} = {val_str}\n")
-
-            with open(self.config_path, "w") as f:
-                f.writelines(new_lines)
-                
-            logging.info("Config updated successfully.")
-            
+                document = TomlDocument(f.read())
+
+            document.update(updates)
+
+            # Write to a sibling file and rename so readers never see a partial config
+            tmp_path = f"{self.config_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(document.dumps())
+            os.chmod(tmp_path, os.stat(self.config_path).st_mode)
+            os.replace(tmp_path, self.config_path)
+
+            logger.info("Config updated successfully.")
+
         except Exception as e:
-            logging.error(f"Error saving config: {e}")
-
-    def _format_val(self, val):
-        if isinstance(val, bool):
-            return "true" if val else "false"
-        elif isinstance(val, (int, float)):
-            return str(val)
-        else:
-            return f'"{val}"'
+            logger.error(f"Error saving config: {e}")
+            return
+
+        # Pick up our own write now rather than waiting for the monitor
+        self.refresh()
+        self.version += 1
+        self.emit("saved", self.version)
@@ -0,0 +1,179 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+from dataclasses import dataclass, field, fields, replace, asdict
+
+PROVIDERS = ("openai", "groq-transcription", "groq-translation")
+OPENAI_MODELS = ("whisper-1", "gpt-4o-transcribe", "gpt-4o-mini-transcribe")
+GROQ_MODELS = ("whisper-large-v3", "whisper-large-v3-turbo")
+INJECTION_MODES = ("fallback", "clipboard", "type")
+
+# Fields shown as dropdowns are stored as strings but edited as indexes
+CHOICES = {
+    ("transcription", "provider"): PROVIDERS,
+    ("transcription", "openai_model"): OPENAI_MODELS,
+    ("transcription", "groq_model"): GROQ_MODELS,
+    ("injection", "mode"): INJECTION_MODES,
+}
+
+
+def parse_timeout(value, default=10):
+    """Parses hyprvoice durations such as "10s" or "5m" into seconds."""
+    try:
+        value = str(value)
+        if value.endswith("s"):
+            return int(value[:-1])
+        elif value.endswith("m"):
+            return int(value[:-1]) * 60
+        return int(value)
+    except ValueError:
+        return default
+
+
+@dataclass(slots=True, frozen=True)
+class TranscriptionConfig:
+    provider: str = "openai"
+    openai_api_key: str = ""
+    openai_model: str = "whisper-1"
+    groq_api_key: str = ""
+    groq_model: str = "whisper-large-v3"
+    language: str = ""
+    # api_key and model are what the daemon actually reads
+    api_key: str = ""
+    model: str = ""
+
+    @classmethod
+    def from_mapping(cls, data):
+        provider = data.get("provider", "openai")
+        openai_key = data.get("openai_api_key", "")
+        openai_model = data.get("openai_model", "whisper-1")
+        groq_key = data.get("groq_api_key", "")
+        groq_model = data.get("groq_model", "whisper-large-v3")
+
+        # Fallback to general api_key/model if specialized keys are missing
+        if provider == "openai":
+            openai_key = openai_key or data.get("api_key", "")
+            openai_model = openai_model or data.get("model", "whisper-1")
+        elif provider.startswith("groq"):
+            groq_key = groq_key or data.get("api_key", "")
+            groq_model = groq_model or data.get("model", "whisper-large-v3")
+
+        return cls(
+            provider=provider,
+            openai_api_key=openai_key,
+            openai_model=openai_model,
+            groq_api_key=groq_key,
+            groq_model=groq_model,
+            language=data.get("language", ""),
+            api_key=data.get("api_key", ""),
+            model=data.get("model", ""),
+        )
+
+    def synced(self):
+        """Returns a copy with api_key/model following the selected provider."""
+        if self.provider == "openai":
+            return replace(self, api_key=self.openai_api_key, model=self.openai_model)
+        return replace(self, api_key=self.groq_api_key, model=self.groq_model)
+
+    def to_toml(self):
+        return asdict(self)
+
+
+@dataclass(slots=True, frozen=True)
+class RecordingConfig:
+    # Seconds; stored by hyprvoice as a duration string
+    timeout: int = 10
+
+    @classmethod
+    def from_mapping(cls, data):
+        return cls(timeout=parse_timeout(data.get("timeout", "10s")))
+
+    def to_toml(self):
+        return {"timeout": f"{self.timeout}s"}
+
+
+@dataclass(slots=True, frozen=True)
+class InjectionConfig:
+    mode: str = "fallback"
+    restore_clipboard: bool = True
+
+    @classmethod
+    def from_mapping(cls, data):
+        return cls(mode=data.get("mode", "fallback"),
+                   restore_clipboard=bool(data.get("restore_clipboard", True)))
+
+    def to_toml(self):
+        return asdict(self)
+
+
+@dataclass(slots=True, frozen=True)
+class NotificationsConfig:
+    enabled: bool = True
+
+    @classmethod
+    def from_mapping(cls, data):
+        return cls(enabled=bool(data.get("enabled", True)))
+
+    def to_toml(self):
+        return asdict(self)
+
+
+@dataclass(slots=True, frozen=True)
+class LoggingConfig:
+    debug: bool = False
+    verbose: bool = False
+
+    @classmethod
+    def from_mapping(cls, data):
+        return cls(debug=bool(data.get("debug", False)),
+                   verbose=bool(data.get("verbose", False)))
+
+    def to_toml(self):
+        return asdict(self)
+
+
+@dataclass(slots=True, frozen=True)
+class WhisConfig:
+    """Typed view of config.toml. Each field name matches its TOML section."""
+
+    transcription: TranscriptionConfig = field(default_factory=TranscriptionConfig)
+    recording: RecordingConfig = field(default_factory=RecordingConfig)
+    injection: InjectionConfig = field(default_factory=InjectionConfig)
+    notifications: NotificationsConfig = field(default_factory=NotificationsConfig)
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
+
+    @classmethod
+    def from_mapping(cls, data):
+        return cls(**{f.name: f.type.from_mapping(data.get(f.name, {})) for f in fields(cls)})
+
+    def get(self, section, key):
+        return getattr(getattr(self, section), key)
+
+    def with_value(self, section, key, value):
+        """Returns a copy with one field changed and the daemon fields re-synced."""
+        changed = replace(self, **{section: replace(getattr(self, section), **{key: value})})
+        return replace(changed, transcription=changed.transcription.synced())
+
+    def get_widget_value(self, section, key):
+        value = self.get(section, key)
+        choices = CHOICES.get((section, key))
+        if choices is not None:
+            return choices.index(value) if value in choices else 0
+        return value
+
+    def with_widget_value(self, section, key, value):
+        choices = CHOICES.get((section, key))
+        if choices is not None:
+            value = choices[value]
+        return self.with_value(section, key, value)
+
+    def diff(self, other):
+        """Returns the section -> key -> value updates that turn self into other."""
+        updates = {}
+        for f in fields(self):
+            old = getattr(self, f.name).to_toml()
+            new = getattr(other, f.name).to_toml()
+            changed = {k: v for k, v in new.items() if old.get(k) != v}
+            if changed:
+                updates[f.name] = changed
+        return updates
@@ -0,0 +1,244 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import time
+import subprocess
+import logging
+from collections import deque
+
+from gi.repository import Gio, GLib, GObject
+
+from .logging_utils import log_function_calls
+
+logger = logging.getLogger(__name__)
+# Daemon output gets its own subsystem so it can be tuned separately
+output_logger = logging.getLogger(f"{__package__}.hyprvoice")
+
+# How a CLI without the reload command reports it; any other failure is retried
+_UNSUPPORTED_MARKERS = ("unknown command", "unknown subcommand", "unsupported", "not supported", "invalid command")
+
+
+class HyprvoiceDaemon(GObject.Object):
+    """
+    Owns the `hyprvoice serve` process and keeps it in step with config.toml.
+
+    Committed config changes are coalesced and pushed with `hyprvoice reload`.
+    If the daemon doesn't support the command, it is restarted instead, but
+    never in the middle of a recording or while a stopped dictation may
+    still be transcribing. Other reload failures are retried a few times.
+
+    Daemon output is read from the main loop through non-blocking IO watches
+    and kept in a bounded ring buffer for the diagnostics window.
+    """
+
+    __gtype_name__ = "HyprvoiceDaemon"
+
+    __gsignals__ = {
+        'output': (GObject.SignalFlags.RUN_FIRST, None, (float, str, str)),
+    }
+
+    # Coalesce bursts of saves, e.g. typing an API key
+    RELOAD_DELAY = 150
+    STOP_TIMEOUT = 2000
+    OUTPUT_LINES = 2000
+    RELOAD_RETRY_DELAY = 2000
+    RELOAD_RETRIES = 3
+    # hyprvoice does not report when a stopped dictation has been transcribed
+    # and injected, so a restart waits this many seconds after a stop
+    TRANSCRIBE_TIMEOUT = 30
+
+    def __init__(self, is_busy=None):
+        super().__init__()
+        self.process = None
+        # (timestamp, stream, line) of recent daemon output
+        self.output = deque(maxlen=self.OUTPUT_LINES)
+        self._partial = {}
+        self.is_busy = is_busy
+        self.applied_version = 0
+        self.pending_version = 0
+        self.supports_reload = None
+        self.reload_failures = 0
+        self.stopped_at = None
+        self._reload_source = None
+        self._restart_source = None
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def dictation_stopped(self):
+        """Notes that a dictation was stopped and is now being transcribed by the daemon."""
+        self.stopped_at = time.monotonic()
+
+    def is_transcribing(self):
+        return self.stopped_at is not None and time.monotonic() - self.stopped_at < self.TRANSCRIBE_TIMEOUT
+
+    def _watch_pipe(self, pipe, stream):
+        os.set_blocking(pipe.fileno(), False)
+        self._partial[stream] = b""
+        GLib.io_add_watch(pipe.fileno(), GLib.PRIORITY_DEFAULT,
+                          GLib.IOCondition.IN | GLib.IOCondition.HUP | GLib.IOCondition.ERR,
+                          self._on_pipe_ready, pipe, stream)
+
+    def _on_pipe_ready(self, fd, condition, pipe, stream):
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b""
+
+        if not data:
+            pipe.close()
+            return False
+
+        *lines, self._partial[stream] = (self._partial[stream] + data).split(b"\n")
+        now = time.time()
+        # Only touch the logging pipeline when someone asked for daemon output
+        log_lines = output_logger.isEnabledFor(logging.DEBUG)
+        for raw in lines:
+            line = raw.decode(errors="replace").rstrip()
+            self.output.append((now, stream, line))
+            if log_lines:
+                output_logger.debug(line)
+            self.emit("output", now, stream, line)
+        return True
+
+    @log_function_calls
+    def start(self):
+        """Starts the hyprvoice daemon if not already running."""
+        if self.is_running():
+            return
+
+        try:
+            # Clean up stale PID file
+            pid_path = os.path.expanduser("~/.cache/hyprvoice/hyprvoice.pid")
+            xdg_cache = os.environ.get('XDG_CACHE_HOME')
+
+            if xdg_cache:
+                pid_path_xdg = os.path.join(xdg_cache, "hyprvoice", "hyprvoice.pid")
+                if os.path.exists(pid_path_xdg):
+                    pid_path = pid_path_xdg
+
+            if os.path.exists(pid_path):
+                logger.info(f"Removing stale PID file: {pid_path}")
+                os.remove(pid_path)
+
+            self.process = subprocess.Popen(
+                ["hyprvoice", "serve"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+
+            # Capture output from the main loop instead of blocking reader threads
+            self._watch_pipe(self.process.stdout, "stdout")
+            self._watch_pipe(self.process.stderr, "stderr")
+
+            # A fresh daemon reads the current config on startup
+            self.applied_version = self.pending_version
+
+        except Exception as e:
+            logger.error(f"Failed to start hyprvoice: {e}")
+            self.process = None
+
+    @log_function_calls
+    def stop(self):
+        if self.process:
+            logger.info("Terminating hyprvoice daemon")
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=self.STOP_TIMEOUT / 1000)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+    def request_reload(self, version):
+        """Schedules the daemon to pick up config `version`."""
+        self.pending_version = max(self.pending_version, version)
+        self.reload_failures = 0
+        if self._reload_source is not None:
+            GLib.source_remove(self._reload_source)
+        self._reload_source = GLib.timeout_add(self.RELOAD_DELAY, self._on_reload_timeout)
+
+    def _on_reload_timeout(self):
+        self._reload_source = None
+        version = self.pending_version
+        if version <= self.applied_version:
+            return False
+
+        if not self.is_running():
+            self.start()
+        elif self.supports_reload is False:
+            self.restart(version)
+        else:
+            try:
+                proc = Gio.Subprocess.new(["hyprvoice", "reload"],
+                                          Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_MERGE)
+                proc.communicate_utf8_async(None, None, self._on_reload_finished, version)
+            except GLib.Error as e:
+                logger.error(f"Failed to run hyprvoice reload: {e}")
+                self.restart(version)
+        return False
+
+    def _on_reload_finished(self, proc, result, version):
+        try:
+            _, stdout, _ = proc.communicate_utf8_finish(result)
+        except GLib.Error as e:
+            stdout = str(e)
+
+        if proc.get_successful():
+            self.supports_reload = True
+            self.reload_failures = 0
+            self.applied_version = max(self.applied_version, version)
+            logger.info(f"hyprvoice reloaded config version {version}")
+            return
+
+        details = (stdout or "").strip()
+        if any(marker in details.lower() for marker in _UNSUPPORTED_MARKERS):
+            logger.info(f"hyprvoice reload unavailable ({details}), falling back to restart")
+            self.supports_reload = False
+            self.restart(version)
+            return
+
+        # A timeout or a daemon that is still starting is no reason to stop reloading
+        self.reload_failures += 1
+        if self.reload_failures > self.RELOAD_RETRIES:
+            logger.error(f"hyprvoice reload failed ({details}), config version {version} applies on the next save")
+            return
+        logger.warning(f"hyprvoice reload failed ({details}), retrying")
+        if self._reload_source is None:
+            self._reload_source = GLib.timeout_add(self.RELOAD_RETRY_DELAY, self._on_reload_timeout)
+
+    def restart(self, version):
+        """Restarts the daemon without blocking the main loop."""
+        if self._restart_source is not None:
+            return
+
+        if self.is_transcribing() or (self.is_busy is not None and self.is_busy()):
+            # Apply once the current dictation is transcribed
+            self._restart_source = GLib.timeout_add(500, self._on_restart_deferred, version)
+            return
+
+        if self.is_running():
+            self.process.terminate()
+        waited = [0]
+        self._restart_source = GLib.timeout_add(10, self._on_restart_poll, version, waited)
+
+    def _on_restart_deferred(self, version):
+        self._restart_source = None
+        if version > self.applied_version:
+            self.restart(version)
+        return False
+
+    def _on_restart_poll(self, version, waited):
+        waited[0] += 10
+        if self.is_running():
+            if waited[0] >= self.STOP_TIMEOUT:
+                self.process.kill()
+            return True
+
+        self._restart_source = None
+        self.process = None
+        self.start()
+        logger.info(f"hyprvoice restarted with config version {version} in {waited[0]}ms")
+        return False
@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import time
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk, GLib
+
+from .scheduler import RequestScheduler
+
+
+class DiagnosticsWindow(Gtk.Window):
+    """Shows recent hyprvoice output from the daemon's ring buffer, with search."""
+
+    STATS_INTERVAL = 1
+
+    def __init__(self, app):
+        super().__init__(application=app)
+        self.set_title("Diagnostics")
+        self.set_default_size(720, 480)
+        self.set_hide_on_close(True)
+
+        self.app = app
+        self.daemon = app.daemon
+        self.query = ""
+
+        main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        main_box.set_margin_top(12)
+        main_box.set_margin_bottom(12)
+        main_box.set_margin_start(12)
+        main_box.set_margin_end(12)
+        self.set_child(main_box)
+
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text("Filter daemon output")
+        self.search_entry.connect("search-changed", self.on_search_changed)
+        main_box.append(self.search_entry)
+
+        self.scheduler_label = Gtk.Label(xalign=0)
+        self.scheduler_label.add_css_class("settings-sub-label")
+        main_box.append(self.scheduler_label)
+        self.injection_label = Gtk.Label(xalign=0)
+        self.injection_label.add_css_class("settings-sub-label")
+        main_box.append(self.injection_label)
+        self.stats_source = GLib.timeout_add_seconds(self.STATS_INTERVAL, self.update_scheduler_stats)
+
+        self.text_view = Gtk.TextView()
+        self.text_view.set_editable(False)
+        self.text_view.set_cursor_visible(False)
+        self.text_view.set_monospace(True)
+        self.buffer = self.text_view.get_buffer()
+
+        self.scrolled_window = Gtk.ScrolledWindow()
+        self.scrolled_window.set_vexpand(True)
+        self.scrolled_window.set_child(self.text_view)
+        main_box.append(self.scrolled_window)
+
+        self.output_handler = self.daemon.connect("output", self.on_daemon_output)
+        self.connect("destroy", self.on_destroy)
+        self.refresh()
+
+    def format_line(self, timestamp, stream, line):
+        return f"{time.strftime('%H:%M:%S', time.localtime(timestamp))} {stream}: {line}\n"
+
+    def matches(self, line):
+        return not self.query or self.query in line.lower()
+
+    def refresh(self):
+        self.buffer.set_text("".join(self.format_line(*entry) for entry in self.daemon.output if self.matches(entry[2])))
+        self.scroll_to_end()
+
+    def scroll_to_end(self):
+        self.buffer.place_cursor(self.buffer.get_end_iter())
+        self.text_view.scroll_to_mark(self.buffer.get_insert(), 0, False, 0, 1)
+
+    def on_search_changed(self, entry):
+        self.query = entry.get_text().lower()
+        self.refresh()
+
+    def on_daemon_output(self, daemon, timestamp, stream, line):
+        if not self.get_visible() or not self.matches(line):
+            return
+        # Trim to the ring buffer size so the view never outgrows it
+        if self.buffer.get_line_count() > daemon.OUTPUT_LINES:
+            self.buffer.delete(self.buffer.get_start_iter(), self.buffer.get_iter_at_line(1)[1])
+        self.buffer.insert(self.buffer.get_end_iter(), self.format_line(timestamp, stream, line))
+        self.scroll_to_end()
+
+    def update_scheduler_stats(self):
+        if self.get_visible():
+            self.scheduler_label.set_text(RequestScheduler.get_default().format_stats())
+            self.injection_label.set_text(f"Injection: {self.app.injector.costs.format_stats()}")
+        return True
+
+    def on_destroy(self, window):
+        self.daemon.disconnect(self.output_handler)
+        GLib.source_remove(self.stats_source)
+
+    def present(self):
+        self.refresh()
+        super().present()
+        self.update_scheduler_stats()
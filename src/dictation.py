@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import time
+import itertools
+import logging
+from collections import deque
+
+from gi.repository import GObject, GLib
+
+from .long_recording import LongRecorder, SEGMENT_TARGET_SECONDS
+from .scheduler import PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("recording", "transcribing", "done", "failed", "cancelled")
+# States after which a job no longer holds up the ones behind it
+SETTLED_STATES = ("done", "failed", "cancelled")
+# A job still transcribing this long after it stopped is given up on, so it
+# cannot hold back every later dictation. Its audio stays in the recordings
+# dir and is offered for recovery on the next start if it never finishes.
+JOB_TIMEOUT_SECONDS = 180
+
+
+class DictationJob(GObject.Object):
+    __gtype_name__ = "DictationJob"
+
+    state = GObject.Property(type=str, default="recording")
+
+    def __init__(self, number, recorder, on_ready=None):
+        super().__init__()
+        self.number = number
+        self.recorder = recorder
+        # Called with (text, latency) for every settled job, including failed,
+        # cancelled and empty ones, instead of emitting 'ready'
+        self.on_ready = on_ready
+        self.text = ""
+        self.error = None
+        self.stopped_at = None
+        self.timeout_source = None
+        # Late signals from a recorder given up on are ignored
+        self.timed_out = False
+
+
+class DictationQueue(GObject.Object):
+    """
+    Back-to-back dictations recorded and transcribed by whis itself.
+
+    A new dictation can start as soon as the previous one stops recording;
+    earlier jobs keep transcribing concurrently. Finished transcripts are
+    released through 'ready' strictly in recording order, so a short
+    dictation never overtakes a longer one that was spoken first.
+    """
+
+    __gtype_name__ = "DictationQueue"
+
+    __gsignals__ = {
+        'changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+        # text, seconds from stop to transcript
+        'ready': (GObject.SignalFlags.RUN_FIRST, None, (str, float)),
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = deque()
+        self.numbers = itertools.count(1)
+
+    def get_recording(self):
+        if self.jobs and self.jobs[-1].state == "recording":
+            return self.jobs[-1]
+        return None
+
+    def is_recording(self):
+        return self.get_recording() is not None
+
+    def start(self, client, device_id="", on_ready=None, segment_target=SEGMENT_TARGET_SECONDS):
+        """Starts recording a new job and returns it, or None while another records."""
+        if self.is_recording():
+            return None
+        recorder = LongRecorder(client, device_id, PRIORITY_INTERACTIVE, segment_target)
+        job = DictationJob(next(self.numbers), recorder, on_ready)
+        recorder.connect("finished", self.on_job_finished, job)
+        recorder.connect("failed", self.on_job_failed, job)
+        recorder.start()
+        self.jobs.append(job)
+        logger.debug(f"Dictation {job.number} recording, {len(self.jobs) - 1} in flight")
+        self.emit("changed")
+        return job
+
+    def stop(self):
+        job = self.get_recording()
+        if job is None:
+            return
+        job.stopped_at = time.monotonic()
+        job.state = "transcribing"
+        job.timeout_source = GLib.timeout_add_seconds(JOB_TIMEOUT_SECONDS, self.on_job_timeout, job)
+        job.recorder.stop()
+        self.emit("changed")
+
+    def cancel(self):
+        """Cancels the dictation being recorded; jobs already stopped still finish."""
+        job = self.get_recording()
+        if job is None:
+            return
+        job.recorder.cancel()
+        job.state = "cancelled"
+        self.flush()
+
+    def cancel_all(self):
+        for job in self.jobs:
+            if job.state not in SETTLED_STATES:
+                job.recorder.cancel()
+            self.clear_timeout(job)
+        self.jobs.clear()
+
+    def clear_timeout(self, job):
+        if job.timeout_source is not None:
+            GLib.source_remove(job.timeout_source)
+            job.timeout_source = None
+
+    def on_job_timeout(self, job):
+        job.timeout_source = None
+        if job.state == "transcribing":
+            logger.error(f"Dictation {job.number} still transcribing after {JOB_TIMEOUT_SECONDS}s, giving up")
+            job.timed_out = True
+            job.error = "transcription timed out"
+            job.state = "failed"
+            self.flush()
+        return False
+
+    def on_job_failed(self, recorder, message, job):
+        if job.timed_out:
+            return
+        logger.error(f"Dictation {job.number}: {message}")
+        job.error = message
+        job.state = "failed"
+        self.emit("changed")
+
+    def on_job_finished(self, recorder, text, job):
+        if job.timed_out:
+            logger.info(f"Dictation {job.number} finished after it timed out, discarding")
+            return
+        self.clear_timeout(job)
+        job.text = text
+        if job.state != "failed":
+            job.state = "done"
+        self.flush()
+
+    def flush(self):
+        while self.jobs and self.jobs[0].state in SETTLED_STATES:
+            job = self.jobs.popleft()
+            self.clear_timeout(job)
+            latency = time.monotonic() - job.stopped_at if job.stopped_at is not None else 0.0
+            if job.on_ready is not None:
+                job.on_ready(job.text, latency)
+            elif job.text:
+                logger.debug(f"Dictation {job.number} ready after {latency:.2f}s")
+                self.emit("ready", job.text, latency)
+        self.emit("changed")
@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import statistics
+from collections import deque
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class FrameStats:
+    """Rolling frame, draw and level-message timings for the pill window."""
+
+    SAMPLES = 240
+
+    def __init__(self):
+        self.frame_intervals = deque(maxlen=self.SAMPLES)
+        self.draw_durations = deque(maxlen=self.SAMPLES)
+        self.level_intervals = deque(maxlen=self.SAMPLES)
+        self.refresh_interval = 1 / 60
+        self.last_frame_time = None
+        self.last_level_time = None
+        self.frames = 0
+        self.dropped = 0
+
+    def reset(self):
+        self.__init__()
+
+    def on_frame(self, frame_time, refresh_interval=None):
+        """Records a frame clock tick. Times are in seconds."""
+        if refresh_interval:
+            self.refresh_interval = refresh_interval
+        if self.last_frame_time is not None:
+            interval = frame_time - self.last_frame_time
+            self.frame_intervals.append(interval)
+            missed = round(interval / self.refresh_interval) - 1
+            if missed > 0:
+                self.dropped += missed
+        self.last_frame_time = frame_time
+        self.frames += 1
+
+    def on_draw(self, duration):
+        self.draw_durations.append(duration)
+
+    def on_level(self, now):
+        if self.last_level_time is not None:
+            self.level_intervals.append(now - self.last_level_time)
+        self.last_level_time = now
+
+    def summary(self):
+        level_rate = 1 / statistics.fmean(self.level_intervals) if self.level_intervals else 0.0
+        level_jitter = statistics.pstdev(self.level_intervals) if len(self.level_intervals) > 1 else 0.0
+        return {
+            "frame_p50_ms": percentile(self.frame_intervals, 50) * 1000,
+            "frame_p95_ms": percentile(self.frame_intervals, 95) * 1000,
+            "frame_p99_ms": percentile(self.frame_intervals, 99) * 1000,
+            "draw_mean_ms": statistics.fmean(self.draw_durations) * 1000 if self.draw_durations else 0.0,
+            "draw_max_ms": max(self.draw_durations, default=0.0) * 1000,
+            "level_hz": level_rate,
+            "level_jitter_ms": level_jitter * 1000,
+            "frames": self.frames,
+            "dropped": self.dropped,
+        }
+
+    def format_summary(self):
+        s = self.summary()
+        return (f"frame p50 {s['frame_p50_ms']:.1f} p95 {s['frame_p95_ms']:.1f} p99 {s['frame_p99_ms']:.1f}ms "
+                f"draw {s['draw_mean_ms']:.2f}/{s['draw_max_ms']:.2f}ms "
+                f"level {s['level_hz']:.1f}Hz ±{s['level_jitter_ms']:.1f}ms "
+                f"dropped {s['dropped']}/{s['frames']}")
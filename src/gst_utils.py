@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import re
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+# Everything whis uploads is 16 kHz mono, which Whisper resamples to anyway,
+# as speech-grade Ogg Opus: about 180 KB per minute, a tenth of PCM
+UPLOAD_CAPS = "audio/x-raw,rate=16000,channels=1"
+UPLOAD_BITRATE = 24000
+UPLOAD_SUFFIX = ".ogg"
+# Encoding runs far faster than real time, so one still running after this
+# many seconds plus this fraction of the audio's duration has stalled
+ENCODE_TIMEOUT_BASE = 30
+ENCODE_TIMEOUT_RATIO = 0.5
+
+_FLOAT_LIST = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def get_float_list(structure, field):
+    """Reads a list-of-floats field, falling back to the serialized structure
+    when the GstValueList can't be converted by the bindings."""
+    try:
+        return list(structure.get_value(field))
+    except TypeError:
+        text = structure.to_string()
+        start = text.index("{", text.index(f"{field}="))
+        return [float(v) for v in _FLOAT_LIST.findall(text[start:text.index("}", start)])]
+
+
+class EncodeError(Exception):
+    pass
+
+
+def get_encode_timeout(duration=None):
+    return ENCODE_TIMEOUT_BASE + (duration or 0) * ENCODE_TIMEOUT_RATIO
+
+
+def make_upload_elements():
+    """Returns an unlinked capsfilter, opusenc and oggmux set up for uploads."""
+    capsfilter = Gst.ElementFactory.make("capsfilter", None)
+    encoder = Gst.ElementFactory.make("opusenc", None)
+    muxer = Gst.ElementFactory.make("oggmux", None)
+    if None in (capsfilter, encoder, muxer):
+        raise EncodeError("Missing GStreamer elements for encoding")
+    capsfilter.set_property("caps", Gst.Caps.from_string(UPLOAD_CAPS))
+    encoder.set_property("bitrate", UPLOAD_BITRATE)
+    return capsfilter, encoder, muxer
+
+
+def encode_for_upload(path, destination, duration=None):
+    """
+    Encodes an audio file to Ogg Opus at destination, which only appears
+    once complete. Blocks until done or timed out, so call it from a
+    worker thread.
+    """
+    pipeline = Gst.Pipeline.new(None)
+    elements = [Gst.ElementFactory.make(name, None) for name in ("filesrc", "decodebin", "audioconvert", "audioresample")]
+    sink = Gst.ElementFactory.make("filesink", None)
+    if None in elements or sink is None:
+        raise EncodeError("Missing GStreamer elements for encoding")
+    src, decode, convert, resample = elements
+    capsfilter, encoder, muxer = make_upload_elements()
+
+    partial = destination + ".part"
+    src.set_property("location", path)
+    sink.set_property("location", partial)
+    chain = (convert, resample, capsfilter, encoder, muxer, sink)
+    for element in (src, decode) + chain:
+        pipeline.add(element)
+    src.link(decode)
+    for upstream, downstream in zip(chain, chain[1:]):
+        upstream.link(downstream)
+
+    def on_pad_added(decodebin, pad):
+        sink_pad = convert.get_static_pad("sink")
+        if not sink_pad.is_linked():
+            pad.link(sink_pad)
+
+    decode.connect("pad-added", on_pad_added)
+
+    timeout = get_encode_timeout(duration)
+    pipeline.set_state(Gst.State.PLAYING)
+    message = pipeline.get_bus().timed_pop_filtered(int(timeout * Gst.SECOND), Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    pipeline.set_state(Gst.State.NULL)
+
+    if message is None or message.type == Gst.MessageType.ERROR:
+        try:
+            os.unlink(partial)
+        except OSError:
+            pass
+        if message is None:
+            raise EncodeError(f"Encoding {path} timed out after {timeout:.0f}s")
+        raise EncodeError(f"Failed to encode {path}: {message.parse_error()[0].message}")
+    os.rename(partial, destination)
+    return destination
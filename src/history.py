@@ -0,0 +1,299 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk, Gdk, Gio, GLib, GObject
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    text TEXT NOT NULL,
+    provider TEXT,
+    model TEXT,
+    latency REAL,
+    source TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(text, content='transcripts', content_rowid='id', prefix='1 2');
+CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN
+    INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_ad AFTER DELETE ON transcripts BEGIN
+    INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+# Bump with a migration in HistoryStore.migrate when the schema changes
+SCHEMA_VERSION = 1
+# Larger than any row id, the keyset bound of the first page
+NEWEST = 2 ** 63 - 1
+
+
+def fts_query(query):
+    """Turns free text into an FTS5 prefix query with every token quoted."""
+    tokens = query.split()
+    return " ".join('"' + token.replace('"', '""') + '"*' for token in tokens)
+
+
+class HistoryStore:
+    """SQLite (WAL) store of past transcripts with an FTS5 index over the text."""
+
+    _default = None
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(GLib.get_user_data_dir(), "whis", "history.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Batch and recording workers add entries from their own threads
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.migrate()
+        self.db.executescript(_SCHEMA)
+        self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def migrate(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Version 1 adds 1 and 2 character prefix indexes, so short
+            # searches don't merge the doclists of every matching term
+            self.db.execute("DROP TABLE IF EXISTS transcripts_fts")
+            self.db.executescript(_SCHEMA)
+            with self.db:
+                self.db.execute("INSERT INTO transcripts_fts(transcripts_fts) VALUES ('rebuild')")
+
+    @classmethod
+    def get_default(cls):
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def add(self, text, provider=None, model=None, latency=None, source="dictation"):
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT INTO transcripts (created, text, provider, model, latency, source) VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), text, provider, model, latency, source))
+        return cursor.lastrowid
+
+    def page(self, before, limit, query=""):
+        """
+        Returns up to limit rows (id, created, text, provider, model, latency)
+        with ids below before, newest first. Keyset paging walks the FTS
+        index in rowid order, so no page costs more than the first.
+        """
+        match = fts_query(query)
+        with self.lock:
+            if not match:
+                return self.db.execute(
+                    "SELECT id, created, text, provider, model, latency FROM transcripts "
+                    "WHERE id < ? ORDER BY id DESC LIMIT ?", (before, limit)).fetchall()
+            ids = [row[0] for row in self.db.execute(
+                "SELECT rowid FROM transcripts_fts WHERE transcripts_fts MATCH ? AND rowid < ? "
+                "ORDER BY rowid DESC LIMIT ?", (match, before, limit))]
+            if not ids:
+                return []
+            return self.db.execute(
+                f"SELECT id, created, text, provider, model, latency FROM transcripts "
+                f"WHERE id IN ({', '.join('?' * len(ids))}) ORDER BY id DESC", ids).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+        HistoryStore._default = None
+
+
+class HistoryItem(GObject.Object):
+    __gtype_name__ = "HistoryItem"
+
+    def __init__(self, row):
+        super().__init__()
+        self.id, self.created, self.text, self.provider, self.model, self.latency = row
+
+
+class HistoryModel(GObject.Object, Gio.ListModel):
+    """
+    Gio.ListModel over the history store that fetches rows a page at a time,
+    so only the rows the list view actually shows are ever loaded.
+
+    Matches are never counted. The model starts with one page and grows by
+    a page whenever the last one is shown, so a search only costs one page
+    query per keystroke. Pages remember their keyset bound, so evicted ones
+    are fetched again without OFFSET scans.
+    """
+
+    __gtype_name__ = "HistoryModel"
+
+    PAGE_SIZE = 100
+    MAX_PAGES = 20
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+        self.query = ""
+        self.pages = OrderedDict()
+        # Keyset bound of every page loaded so far: its rows have smaller ids
+        self.page_keys = []
+        self.next_key = NEWEST
+        self.complete = False
+        self.more_source = None
+        self.n_items = 0
+        self.load_page()
+
+    def do_get_item_type(self):
+        return HistoryItem.__gtype__
+
+    def do_get_n_items(self):
+        return self.n_items
+
+    def do_get_item(self, position):
+        if position >= self.n_items:
+            return None
+        index, offset = divmod(position, self.PAGE_SIZE)
+        page = self.pages.get(index)
+        if page is None:
+            page = self.cache_page(index, self.store.page(self.page_keys[index], self.PAGE_SIZE, self.query))
+        else:
+            self.pages.move_to_end(index)
+        if index == len(self.page_keys) - 1 and not self.complete and self.more_source is None:
+            # Items can't change from inside get_item, so grow once it returns
+            self.more_source = GLib.idle_add(self.on_load_more)
+        return page[offset] if offset < len(page) else None
+
+    def cache_page(self, index, rows):
+        page = [HistoryItem(row) for row in rows]
+        self.pages[index] = page
+        if len(self.pages) > self.MAX_PAGES:
+            self.pages.popitem(last=False)
+        return page
+
+    def load_page(self):
+        """Appends the next page without notifying, returning how many rows it added."""
+        try:
+            rows = self.store.page(self.next_key, self.PAGE_SIZE, self.query)
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Invalid history query {self.query!r}: {e}")
+            rows = []
+        self.complete = len(rows) < self.PAGE_SIZE
+        if rows:
+            self.page_keys.append(self.next_key)
+            self.cache_page(len(self.page_keys) - 1, rows)
+            self.next_key = rows[-1][0]
+            self.n_items += len(rows)
+        return len(rows)
+
+    def on_load_more(self):
+        self.more_source = None
+        position = self.n_items
+        added = self.load_page()
+        if added:
+            self.items_changed(position, 0, added)
+        return False
+
+    def reload(self, query=None):
+        if query is not None:
+            self.query = query.strip()
+        if self.more_source is not None:
+            GLib.source_remove(self.more_source)
+            self.more_source = None
+        removed = self.n_items
+        self.pages.clear()
+        self.page_keys = []
+        self.next_key = NEWEST
+        self.n_items = 0
+        self.load_page()
+        self.items_changed(0, removed, self.n_items)
+
+
+class HistoryWindow(Gtk.Window):
+    """Searchable list of past transcripts. Activating a row copies it."""
+
+    def __init__(self, app):
+        super().__init__(application=app)
+        self.set_title("History")
+        self.set_default_size(560, 520)
+        self.set_hide_on_close(True)
+
+        self.model = HistoryModel(HistoryStore.get_default())
+
+        main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        main_box.set_margin_top(12)
+        main_box.set_margin_bottom(12)
+        main_box.set_margin_start(12)
+        main_box.set_margin_end(12)
+        self.set_child(main_box)
+
+        # hyprvoice injects its own transcripts without reporting them in a
+        # documented format, so only the built-in engine's dictations are kept
+        self.engine_label = Gtk.Label(xalign=0)
+        self.engine_label.set_wrap(True)
+        self.engine_label.add_css_class("settings-sub-label")
+        self.engine_label.set_text("Dictations made with the hyprvoice engine are not recorded here. "
+                                   "Switch to the built-in engine in Preferences to keep them in history.")
+        main_box.append(self.engine_label)
+
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text("Search transcripts")
+        self.search_entry.connect("search-changed", self.on_search_changed)
+        main_box.append(self.search_entry)
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self.on_item_setup)
+        factory.connect("bind", self.on_item_bind)
+
+        self.list_view = Gtk.ListView(model=Gtk.NoSelection(model=self.model), factory=factory)
+        self.list_view.set_single_click_activate(False)
+        self.list_view.connect("activate", self.on_item_activated)
+
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_vexpand(True)
+        scrolled_window.set_child(self.list_view)
+        main_box.append(scrolled_window)
+
+    def on_item_setup(self, factory, list_item):
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+        box.set_margin_top(6)
+        box.set_margin_bottom(6)
+        text = Gtk.Label(xalign=0)
+        text.set_wrap(True)
+        meta = Gtk.Label(xalign=0)
+        meta.add_css_class("settings-sub-label")
+        box.append(text)
+        box.append(meta)
+        list_item.set_child(box)
+
+    def on_item_bind(self, factory, list_item):
+        item = list_item.get_item()
+        text = list_item.get_child().get_first_child()
+        meta = text.get_next_sibling()
+        if item is None:
+            text.set_text("")
+            meta.set_text("")
+            return
+        text.set_text(item.text)
+        details = [time.strftime("%Y-%m-%d %H:%M", time.localtime(item.created))]
+        details += [v for v in (item.provider, item.model) if v]
+        if item.latency is not None:
+            details.append(f"{item.latency:.1f}s")
+        meta.set_text(" · ".join(details))
+
+    def on_search_changed(self, entry):
+        self.model.reload(entry.get_text())
+
+    def on_item_activated(self, list_view, position):
+        item = self.model.get_item(position)
+        if item is not None:
+            Gdk.Display.get_default().get_clipboard().set(item.text)
+
+    def present(self):
+        self.engine_label.set_visible(self.get_application().gio_settings.get_string("dictation-engine") == "hyprvoice")
+        self.model.reload()
+        super().present()
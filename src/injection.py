@@ -0,0 +1,483 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import re
+import time
+import queue
+import select
+import tempfile
+import threading
+import subprocess
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+COMMAND_TIMEOUT = 10
+# Give the focused client time to read the clipboard before it is restored
+PASTE_SETTLE = 0.15
+# Typed output is sent in chunks of about this many characters
+CHUNK_CHARS = 200
+# Weight of the newest measurement in the running cost estimates
+EWMA_ALPHA = 0.2
+
+# Clipboard text up to this size is kept in memory for restoring...
+SNAPSHOT_LIMIT = 256 * 1024
+# ...anything else is spooled to a file, within this time budget
+SNAPSHOT_TIMEOUT = 0.25
+TEXT_TYPES = ("text/plain;charset=utf-8", "UTF8_STRING", "text/plain", "STRING", "TEXT")
+# File lists lose their meaning when only restored as plain text
+FILE_LIST_TYPE = "text/uri-list"
+RICH_TEXT_TYPES = ("text/html", "text/rtf", "application/rtf")
+_META_TYPES = ("TARGETS", "TIMESTAMP", "MULTIPLE", "SAVE_TARGETS")
+
+STRATEGY_TYPE = "type"
+STRATEGY_PASTE = "paste"
+
+# Typed newlines and tabs press Enter/Tab in the target, and characters
+# outside the BMP need a temporary keymap many clients handle badly
+_PASTE_ONLY = re.compile(r"[\n\r\t\U00010000-\U0010ffff]")
+
+
+class InjectionError(Exception):
+    pass
+
+
+class SnapshotError(InjectionError):
+    """The clipboard could not be saved, so pasting would destroy it."""
+
+
+class PasteRequiredError(InjectionError):
+    """Text that must not be typed could not be pasted."""
+
+    def __init__(self, message, on_clipboard):
+        super().__init__(message)
+        # Whether the text was left on the clipboard for the user to paste
+        self.on_clipboard = on_clipboard
+
+
+def run_tool(args, input=None, stdin=None, capture=True):
+    # wl-copy keeps serving from a forked child, which would hold captured pipes open
+    output = subprocess.PIPE if capture else subprocess.DEVNULL
+    try:
+        result = subprocess.run(args, input=input, stdin=stdin, stdout=output, stderr=output,
+                                timeout=COMMAND_TIMEOUT, check=False)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise InjectionError(f"{args[0]} failed: {e}") from e
+    if result.returncode != 0:
+        details = result.stderr.decode(errors="replace").strip() if result.stderr else ""
+        raise InjectionError(f"{args[0]} exited with {result.returncode}: {details}")
+    return result.stdout
+
+
+def split_chunks(text, size=CHUNK_CHARS):
+    """Splits text into chunks of at most about size characters, preferring whitespace."""
+    chunks = []
+    while len(text) > size:
+        cut = text.rfind(" ", size // 2, size)
+        cut = size if cut == -1 else cut + 1
+        chunks.append(text[:cut])
+        text = text[cut:]
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def choose_mime_type(types):
+    """
+    Picks the one offered type worth restoring, or None.
+
+    wl-copy offers a single type. Files and images win over a plain text
+    fallback, which would lose their meaning, but rich text offered with
+    plain text is restored as plain text: most targets accept that, while
+    terminals and text fields paste nothing from text/html alone.
+    """
+    if FILE_LIST_TYPE in types:
+        return FILE_LIST_TYPE
+    for mime_type in types:
+        if mime_type.startswith("image/"):
+            return mime_type
+    for mime_type in TEXT_TYPES + RICH_TEXT_TYPES:
+        if mime_type in types:
+            return mime_type
+    for mime_type in types:
+        if mime_type not in _META_TYPES:
+            return mime_type
+    return None
+
+
+@dataclass(slots=True)
+class ClipboardSnapshot:
+    """One type of the user's clipboard, held in memory or spooled to a file."""
+
+    mime_type: str
+    data: bytes = None
+    spool_path: str = None
+
+    def restore(self, backend):
+        try:
+            if self.spool_path is not None:
+                backend.offer_clipboard_file(self.spool_path, self.mime_type)
+            else:
+                backend.write_clipboard(self.data, self.mime_type)
+        finally:
+            self.discard()
+
+    def discard(self):
+        if self.spool_path is not None:
+            try:
+                os.unlink(self.spool_path)
+            except OSError:
+                pass
+            self.spool_path = None
+
+
+def take_snapshot(backend, limit=SNAPSHOT_LIMIT, timeout=SNAPSHOT_TIMEOUT):
+    """
+    Saves the current clipboard for restoring after a paste.
+
+    Only the offered types are listed up front, then a single type is
+    fetched. Text up to limit bytes is kept in memory; larger or binary
+    payloads are written to a file by wl-paste itself, never passing
+    through whis, and re-offered from there. Spooling is still a full copy
+    of the payload on every paste, so paste latency grows with clipboard
+    size up to timeout, which bounds the whole snapshot. Returns None for
+    an empty clipboard and raises SnapshotError when it cannot be saved in
+    time, so the caller can type instead of pasting over it.
+    """
+    mime_type = choose_mime_type(backend.list_clipboard_types())
+    if mime_type is None:
+        return None
+
+    deadline = time.monotonic() + timeout
+    try:
+        if mime_type in TEXT_TYPES or mime_type in RICH_TEXT_TYPES or mime_type == FILE_LIST_TYPE:
+            data = backend.read_clipboard(mime_type, limit, timeout)
+            if data is not None:
+                return ClipboardSnapshot(mime_type, data)
+        try:
+            fd, path = tempfile.mkstemp(prefix="whis-clipboard-", dir=os.environ.get("XDG_RUNTIME_DIR"))
+        except OSError as e:
+            raise InjectionError(f"cannot create spool file: {e}") from e
+        os.close(fd)
+        snapshot = ClipboardSnapshot(mime_type, spool_path=path)
+        try:
+            backend.spool_clipboard(mime_type, path, max(0.0, deadline - time.monotonic()))
+        except InjectionError:
+            snapshot.discard()
+            raise
+        return snapshot
+    except InjectionError as e:
+        raise SnapshotError(f"clipboard ({mime_type}) could not be saved: {e}") from e
+
+
+class WaylandBackend:
+    """Types with wtype and pastes through wl-clipboard."""
+
+    def type_text(self, text):
+        run_tool(["wtype", "--", text])
+
+    def list_clipboard_types(self):
+        try:
+            return run_tool(["wl-paste", "--list-types"]).decode(errors="replace").split()
+        except InjectionError:
+            # wl-paste fails when the clipboard is empty
+            return []
+
+    def read_clipboard(self, mime_type, limit, timeout):
+        """Returns the clipboard as mime_type, or None if it is larger than limit bytes."""
+        try:
+            process = subprocess.Popen(["wl-paste", "--no-newline", "--type", mime_type],
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            raise InjectionError(f"wl-paste failed: {e}") from e
+        deadline = time.monotonic() + timeout
+        chunks = []
+        size = 0
+        try:
+            fd = process.stdout.fileno()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise InjectionError(f"reading {mime_type} timed out")
+                if not select.select([fd], [], [], remaining)[0]:
+                    continue
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    return None
+                chunks.append(chunk)
+        finally:
+            process.kill()
+            process.wait()
+            process.stdout.close()
+        return b"".join(chunks)
+
+    def spool_clipboard(self, mime_type, path, timeout):
+        with open(path, "wb") as f:
+            try:
+                process = subprocess.Popen(["wl-paste", "--type", mime_type], stdout=f, stderr=subprocess.DEVNULL)
+            except OSError as e:
+                raise InjectionError(f"wl-paste failed: {e}") from e
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise InjectionError(f"spooling {mime_type} took longer than {timeout:.2f}s")
+        if process.returncode != 0:
+            raise InjectionError(f"wl-paste exited with {process.returncode}")
+
+    def write_clipboard(self, data, mime_type=None):
+        run_tool(["wl-copy"] + (["--type", mime_type] if mime_type else []), input=data, capture=False)
+
+    def offer_clipboard_file(self, path, mime_type):
+        with open(path, "rb") as f:
+            run_tool(["wl-copy", "--type", mime_type], stdin=f, capture=False)
+
+    def paste(self):
+        run_tool(["wtype", "-M", "ctrl", "v", "-m", "ctrl"])
+
+    def settle(self):
+        time.sleep(PASTE_SETTLE)
+
+
+class FakeBackend:
+    """
+    Records what would be injected and simulates tool latency, for trying
+    out strategies without touching the desktop.
+    """
+
+    def __init__(self, per_char=0.004, per_call=0.02, paste=0.03, fail_type=False, spool_rate=200e6):
+        self.per_char = per_char
+        self.per_call = per_call
+        self.paste_delay = paste
+        self.fail_type = fail_type
+        # Bytes per second wl-paste manages when spooling the clipboard
+        self.spool_rate = spool_rate
+        # mime type -> bytes
+        self.clipboard = {}
+        self.typed = []
+        self.pasted = []
+
+    def type_text(self, text):
+        if self.fail_type:
+            raise InjectionError("typing disabled")
+        time.sleep(self.per_call + self.per_char * len(text))
+        self.typed.append(text)
+
+    def list_clipboard_types(self):
+        return list(self.clipboard)
+
+    def read_clipboard(self, mime_type, limit, timeout):
+        data = self.clipboard[mime_type]
+        return data if len(data) <= limit else None
+
+    def spool_clipboard(self, mime_type, path, timeout):
+        data = self.clipboard[mime_type]
+        duration = len(data) / self.spool_rate
+        if duration > timeout:
+            time.sleep(timeout)
+            raise InjectionError(f"spooling {mime_type} took longer than {timeout:.2f}s")
+        time.sleep(duration)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def write_clipboard(self, data, mime_type=None):
+        self.clipboard = {mime_type or TEXT_TYPES[0]: data}
+
+    def offer_clipboard_file(self, path, mime_type):
+        with open(path, "rb") as f:
+            self.clipboard = {mime_type: f.read()}
+
+    def paste(self):
+        time.sleep(self.paste_delay)
+        self.pasted.append(self.clipboard[TEXT_TYPES[0]].decode())
+
+    def settle(self):
+        pass
+
+
+class CostModel:
+    """Running estimates of how long each strategy takes, learned from measurements."""
+
+    def __init__(self, type_per_char=0.004, type_per_call=0.02, paste=0.2):
+        self.type_per_char = type_per_char
+        self.type_per_call = type_per_call
+        self.paste = paste
+        self.samples = {STRATEGY_TYPE: [0, 0.0], STRATEGY_PASTE: [0, 0.0]}
+
+    def estimate(self, strategy, length):
+        if strategy == STRATEGY_PASTE:
+            return self.paste
+        chunks = max(1, -(-length // CHUNK_CHARS))
+        return chunks * self.type_per_call + length * self.type_per_char
+
+    def record(self, strategy, length, chunks, duration):
+        count, total = self.samples[strategy]
+        self.samples[strategy] = [count + 1, total + duration]
+        if strategy == STRATEGY_PASTE:
+            self.paste += EWMA_ALPHA * (duration - self.paste)
+        elif length:
+            per_char = max(0.0, (duration - chunks * self.type_per_call) / length)
+            self.type_per_char += EWMA_ALPHA * (per_char - self.type_per_char)
+
+    def format_stats(self):
+        parts = []
+        for strategy, (count, total) in self.samples.items():
+            if count:
+                parts.append(f"{strategy} {count}x avg {total / count * 1000:.0f}ms")
+        return (", ".join(parts) or "no injections") + \
+            f" · model type {self.type_per_char * 1000:.1f}ms/char, paste {self.paste * 1000:.0f}ms"
+
+
+class Injector:
+    """
+    Inserts transcripts into the focused window.
+
+    Texts are injected one at a time on a worker thread, strictly in the
+    order they were submitted. In adaptive mode each transcript is typed or
+    pasted depending on its characters and on which strategy the cost model
+    predicts to be faster for its length, and every injection is timed to
+    keep the model current.
+
+    on_not_pasted is called on the worker thread with the text and the
+    PasteRequiredError when text that must not be typed fails to paste.
+    """
+
+    def __init__(self, backend=None, on_not_pasted=None):
+        self.backend = backend or WaylandBackend()
+        self.on_not_pasted = on_not_pasted
+        self.costs = CostModel()
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def inject(self, text, config, adaptive=False):
+        """Queues text for injection; config is a config_schema.InjectionConfig."""
+        self.queue.put((text, config, adaptive))
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="whis-inject", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            text, config, adaptive = self.queue.get()
+            # Anything escaping here would end the thread and strand every later transcript
+            try:
+                self.inject_now(text, config, adaptive)
+            except PasteRequiredError as e:
+                logger.error(f"Injection failed: {e}")
+                if self.on_not_pasted is not None:
+                    self.on_not_pasted(text, e)
+            except InjectionError as e:
+                logger.error(f"Injection failed: {e}")
+            except Exception:
+                logger.exception(f"Injection of {len(text)} chars failed unexpectedly")
+
+    def choose_strategy(self, text):
+        if _PASTE_ONLY.search(text):
+            return STRATEGY_PASTE
+        if self.costs.estimate(STRATEGY_TYPE, len(text)) <= self.costs.estimate(STRATEGY_PASTE, len(text)):
+            return STRATEGY_TYPE
+        return STRATEGY_PASTE
+
+    def inject_now(self, text, config, adaptive=False):
+        """Injects text on the calling thread and returns the strategy that worked."""
+        if adaptive:
+            first = self.choose_strategy(text)
+        elif config.mode == "clipboard":
+            first = STRATEGY_PASTE
+        else:
+            first = STRATEGY_TYPE
+
+        # Only "type" mode refuses to fall back, but a clipboard that cannot
+        # be saved is never pasted over when it was asked to be restored
+        allow_fallback = adaptive or config.mode == "fallback"
+        try:
+            self.run_strategy(first, text, config.restore_clipboard)
+            return first
+        except InjectionError as e:
+            if first == STRATEGY_PASTE and _PASTE_ONLY.search(text):
+                # Typing it would press Enter and Tab in the target, which can submit a form or message
+                raise PasteRequiredError(f"pasting failed and the text cannot be typed: {e}",
+                                         self.leave_on_clipboard(text, e)) from e
+            if not allow_fallback and not isinstance(e, SnapshotError):
+                raise
+            logger.debug(f"{first} failed, falling back: {e}")
+        second = STRATEGY_PASTE if first == STRATEGY_TYPE else STRATEGY_TYPE
+        self.run_strategy(second, text, config.restore_clipboard)
+        return second
+
+    def leave_on_clipboard(self, text, error):
+        """Puts text on the clipboard after a failed paste, unless that would destroy an unsaved clipboard."""
+        if isinstance(error, SnapshotError):
+            return False
+        try:
+            self.backend.write_clipboard(text.encode(), TEXT_TYPES[0])
+        except InjectionError:
+            return False
+        return True
+
+    def run_strategy(self, strategy, text, restore_clipboard):
+        if strategy == STRATEGY_TYPE:
+            start = time.perf_counter()
+            chunks = split_chunks(text)
+            for chunk in chunks:
+                self.backend.type_text(chunk)
+            duration = time.perf_counter() - start
+        else:
+            chunks = [text]
+            duration = self.paste_text(text, restore_clipboard)
+        self.costs.record(strategy, len(text), len(chunks), duration)
+        logger.debug(f"Injected {len(text)} chars by {strategy} in {duration * 1000:.0f}ms ({len(chunks)} call(s))")
+
+    def paste_text(self, text, restore_clipboard):
+        """
+        Pastes text and returns how long writing and pasting it took.
+
+        Saving and restoring the clipboard is left out of the measurement,
+        so the type/paste decision does not depend on the restore setting.
+        """
+        snapshot = take_snapshot(self.backend) if restore_clipboard else None
+        start = time.perf_counter()
+        try:
+            self.backend.write_clipboard(text.encode(), TEXT_TYPES[0])
+            self.backend.paste()
+        except InjectionError:
+            if snapshot is not None:
+                snapshot.discard()
+            raise
+        duration = time.perf_counter() - start
+        if snapshot is not None:
+            self.backend.settle()
+            snapshot.restore(self.backend)
+        return duration
+
+
+if __name__ == "__main__":
+    from types import SimpleNamespace
+
+    backend = FakeBackend()
+    injector = Injector(backend)
+    config = SimpleNamespace(mode="fallback", restore_clipboard=True)
+    samples = ["Yes.", "Sounds good, see you at three.", "word " * 40, "line one\nline two", "word " * 400]
+    for _ in range(3):
+        for text in samples:
+            strategy = injector.inject_now(text, config, adaptive=True)
+            print(f"{len(text):5} chars -> {strategy}")
+    print(injector.costs.format_stats())
+
+    image = os.urandom(8 * 1024 * 1024)
+    clipboard_config = SimpleNamespace(mode="clipboard", restore_clipboard=True)
+    # 8 MiB in 40ms fits the snapshot budget, in 800ms it does not
+    for rate in (200e6, 10e6):
+        backend.spool_rate = rate
+        backend.clipboard = {"text/plain": b"image.png", "image/png": image}
+        start = time.perf_counter()
+        strategy = injector.inject_now("pasted over an image", clipboard_config)
+        kept = backend.clipboard.get("image/png") == image
+        print(f"8 MiB image at {rate / 1e6:.0f} MB/s: {strategy} in {(time.perf_counter() - start) * 1000:.0f}ms, "
+              f"image kept {kept}")
@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import time
+import mmap
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+MAGIC = b"WHISJRN1"
+STATE_RECORDING = 0
+STATE_FINISHED = 1
+
+# A complete WAV header with a private "whJr" chunk between fmt and data, so a
+# finished journal is a playable WAV file as is:
+# RIFF size WAVE | fmt 16 format channels rate byte_rate block_align bits |
+# whJr 32 magic state reserved created checkpoint | data size
+HEADER = struct.Struct("<4sI4s 4sIHHIIHH 4sI8sIIdd 4sI")
+
+# Preallocated in steps of about 30 s of 16 kHz mono audio
+GROW_BYTES = 1024 * 1024
+CHECKPOINT_INTERVAL = 1.0
+
+
+class JournalError(Exception):
+    pass
+
+
+class RecordingJournal:
+    """
+    Append-only, memory-mapped PCM journal.
+
+    Audio is copied into a preallocated mapping, and the header, including
+    the committed data length, is rewritten and synced at most once per
+    CHECKPOINT_INTERVAL. After a crash, at most that much audio is lost. A
+    normal finish only truncates the preallocated tail and renames the file.
+    """
+
+    def __init__(self, path, sample_rate, channels=1, sample_width=2):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.length = 0
+        self.created = time.time()
+        self.last_checkpoint = 0.0
+        self.mm = None
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        self.grow(GROW_BYTES)
+        self.checkpoint()
+
+    @property
+    def duration(self):
+        return self.length / (self.sample_rate * self.channels * self.sample_width)
+
+    def grow(self, size):
+        if self.mm is not None:
+            self.mm.close()
+        size = HEADER.size + size
+        try:
+            os.posix_fallocate(self.fd, 0, size)
+        except (AttributeError, OSError):
+            os.ftruncate(self.fd, size)
+        self.mm = mmap.mmap(self.fd, size)
+
+    def append(self, data):
+        start = HEADER.size + self.length
+        end = start + len(data)
+        if end > len(self.mm):
+            self.grow(self.length + len(data) + GROW_BYTES)
+        self.mm[start:end] = data
+        self.length += len(data)
+        if time.monotonic() - self.last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.checkpoint()
+
+    def checkpoint(self, state=STATE_RECORDING):
+        pack_header(self.mm, self.length, self.sample_rate, self.channels, self.sample_width,
+                    state, self.created, time.time())
+        self.mm.flush()
+        self.last_checkpoint = time.monotonic()
+
+    def finish(self, destination):
+        """Commits the journal as a WAV file at destination without copying it."""
+        self.checkpoint(STATE_FINISHED)
+        self.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER.size + self.length)
+        os.rename(self.path, destination)
+        return destination
+
+    def discard(self):
+        self.close()
+        os.unlink(self.path)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def pack_header(buffer, length, sample_rate, channels, sample_width, state, created, checkpoint):
+    block_align = channels * sample_width
+    HEADER.pack_into(
+        buffer, 0,
+        b"RIFF", HEADER.size - 8 + length, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b"whJr", 32, MAGIC, state, 0, created, checkpoint,
+        b"data", length)
+
+
+def recover_journal(path, destination):
+    """
+    Turns an unfinished journal into a WAV file at destination, keeping the
+    audio up to its last checkpoint. Returns the recovered duration in seconds.
+    """
+    with open(path, "r+b") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise JournalError(f"{path} is too short to be a journal")
+        fields = HEADER.unpack(header)
+        (_, _, _, _, _, _, channels, sample_rate, _, _, bits, _, _, magic, _, _, created, checkpoint, _, length) = fields
+        if magic != MAGIC:
+            raise JournalError(f"{path} is not a whis journal")
+        available = os.fstat(f.fileno()).st_size - HEADER.size
+        length = min(length, available)
+        buffer = bytearray(HEADER.size)
+        pack_header(buffer, length, sample_rate, channels, bits // 8, STATE_FINISHED, created, checkpoint)
+        f.seek(0)
+        f.write(buffer)
+        f.truncate(HEADER.size + length)
+    os.rename(path, destination)
+    return length / (sample_rate * channels * (bits // 8))
+
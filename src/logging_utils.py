@@ -1,44 +1,240 @@
+import os
+import gzip
+import queue
+import shutil
 import logging
+import logging.handlers
+import sys
+import random
+import reprlib
 import functools
 import time
 
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+DATE_FORMAT = '%Y/%m/%d %H:%M:%S'
+
+_listener = None
+
 # Global flag for verbose logging
 _VERBOSE_LOGGING = False
 
+# Functions registered by log_function_calls and the wrappers currently installed
+_TRACED = []
+_INSTALLED = {}
+# GObject vfunc implementations registered for tracing -> wrapper while installed
+_VFUNCS = {}
+# Module prefix -> fraction of calls traced
+_SAMPLE_RATES = {}
+# Function name -> [calls, total seconds, max seconds, exceptions]
+_STATS = {}
+
+trace_logger = logging.getLogger(f"{__package__}.trace")
+
+_repr = reprlib.Repr()
+_repr.maxstring = 100
+_repr.maxother = 100
+
 def set_verbose_logging(enabled):
     global _VERBOSE_LOGGING
     _VERBOSE_LOGGING = enabled
     if enabled:
         logging.getLogger().setLevel(logging.DEBUG)
         logging.debug("Verbose logging enabled.")
+        install_tracing()
+    else:
+        uninstall_tracing()
 
 def get_verbose_logging():
     return _VERBOSE_LOGGING
 
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-based rotation that gzips the rotated files."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records unformatted, so the listener thread does all formatting.
+
+    Arguments are only merged into the message there, after the call that
+    logged them has moved on, so they must be immutable: traced calls
+    snapshot theirs with _repr on the calling thread, everything else logs
+    f-strings or plain values.
+    """
+
+    def prepare(self, record):
+        return record
+
+def setup_logging(log_file, level=logging.INFO, max_bytes=1024 * 1024, backup_count=5):
+    """
+    Routes all records through a queue so callers never touch the disk.
+    A background QueueListener writes them to stderr and a rotating log file.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    handlers = [logging.StreamHandler(), CompressingRotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(records))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Flushes queued records and stops the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def set_logger_levels(levels):
+    """Applies per-subsystem levels, e.g. {"whis.window": "debug"}."""
+    for name, level in levels.items():
+        try:
+            logging.getLogger(name).setLevel(str(level).upper())
+        except ValueError:
+            logging.getLogger(__name__).warning(f"Ignoring invalid log level {level!r} for {name}")
+
+class TraceRecord:
+    """Structured result of one traced call, attached to log records as `trace`."""
+
+    __slots__ = ("function", "duration", "exception")
+
+    def __init__(self, function, duration, exception=None):
+        self.function = function
+        self.duration = duration
+        self.exception = exception
+
+def _format_args(args, kwargs):
+    # Runs on the calling thread: the objects may change or not be thread-safe later
+    parts = [_repr.repr(a) for a in args]
+    parts += [f"{k}={_repr.repr(v)}" for k, v in kwargs.items()]
+    return ", ".join(parts)
+
 def log_function_calls(func):
-    """Decorator to log function calls with arguments and execution time."""
+    """
+    Registers func for call tracing and returns it unchanged.
+    Tracing wrappers are only installed while verbose logging is on.
+
+    PyGObject binds do_* vfunc implementations when the class is created,
+    so swapping the attribute later never reaches calls coming from GTK.
+    Those get a permanent thin wrapper that traces only while installed.
+    """
+    if not func.__name__.startswith("do_"):
+        _TRACED.append(func)
+        return func
+
+    _VFUNCS[func] = None
+
+    @functools.wraps(func)
+    def vfunc(*args, **kwargs):
+        return (_VFUNCS[func] or func)(*args, **kwargs)
+    return vfunc
+
+def set_sample_rate(module_prefix, rate):
+    """Traces only a fraction of calls for functions under module_prefix."""
+    _SAMPLE_RATES[module_prefix] = max(0.0, min(1.0, float(rate)))
+    if _INSTALLED or any(_VFUNCS.values()):
+        uninstall_tracing()
+        install_tracing()
+
+def _sample_rate(module):
+    best, rate = -1, 1.0
+    for prefix, value in _SAMPLE_RATES.items():
+        if (module == prefix or module.startswith(prefix + ".")) and len(prefix) > best:
+            best, rate = len(prefix), value
+    return rate
+
+def _resolve_owner(func):
+    parts = func.__qualname__.split(".")
+    if "<locals>" in parts:
+        return None, None
+    owner = sys.modules.get(func.__module__)
+    for part in parts[:-1]:
+        owner = getattr(owner, part, None)
+    if owner is None or vars(owner).get(parts[-1]) is not func:
+        return None, None
+    return owner, parts[-1]
+
+def install_tracing():
+    """Swaps every registered function for its tracing wrapper."""
+    for func in _TRACED:
+        owner, name = _resolve_owner(func)
+        if owner is not None:
+            setattr(owner, name, _make_wrapper(func, _sample_rate(func.__module__)))
+            _INSTALLED[(owner, name)] = func
+    for func in _VFUNCS:
+        _VFUNCS[func] = _make_wrapper(func, _sample_rate(func.__module__))
+
+def uninstall_tracing():
+    """Restores the original functions so disabled tracing costs nothing."""
+    for (owner, name), func in _INSTALLED.items():
+        setattr(owner, name, func)
+    _INSTALLED.clear()
+    for func in _VFUNCS:
+        _VFUNCS[func] = None
+
+def _make_wrapper(func, rate):
+    func_name = f"{func.__module__}.{func.__qualname__}"
+    stats = _STATS.setdefault(func_name, [0, 0.0, 0.0, 0])
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        if not _VERBOSE_LOGGING:
+        if rate < 1.0 and random.random() >= rate:
             return func(*args, **kwargs)
-        
-        func_name = f"{func.__module__}.{func.__qualname__}"
-        # Avoid logging massive data in args
-        args_repr = [repr(a)[:100] + "..." if len(repr(a)) > 100 else repr(a) for a in args]
-        kwargs_repr = [f"{k}={v!r}"[:100] + "..." if len(f"{k}={v!r}") > 100 else f"{k}={v!r}" for k, v in kwargs.items()]
-        signature = ", ".join(args_repr + kwargs_repr)
-        
-        logging.debug(f"CALL: {func_name}({signature})")
+
+        # Arguments are only formatted for records that will be logged
+        verbose = trace_logger.isEnabledFor(logging.DEBUG)
+        if verbose:
+            trace_logger.debug("CALL: %s(%s)", func_name, _format_args(args, kwargs))
         start_time = time.perf_counter()
         try:
             result = func(*args, **kwargs)
-            end_time = time.perf_counter()
-            duration = end_time - start_time
-            logging.debug(f"RETURN: {func_name} -> {repr(result)[:100]}... (took {duration:.4f}s)")
-            return result
         except Exception as e:
-            end_time = time.perf_counter()
-            duration = end_time - start_time
-            logging.error(f"EXCEPTION: {func_name} -> {e} (took {duration:.4f}s)")
-            raise e
+            duration = time.perf_counter() - start_time
+            _record(stats, duration, True)
+            trace_logger.error("EXCEPTION: %s -> %s (took %.4fs)", func_name, str(e), duration,
+                               extra={"trace": TraceRecord(func_name, duration, e)})
+            raise
+        duration = time.perf_counter() - start_time
+        _record(stats, duration, False)
+        if verbose:
+            trace_logger.debug("RETURN: %s -> %s (took %.4fs)", func_name, _repr.repr(result), duration,
+                               extra={"trace": TraceRecord(func_name, duration)})
+        return result
     return wrapper
+
+def _record(stats, duration, failed):
+    stats[0] += 1
+    stats[1] += duration
+    if duration > stats[2]:
+        stats[2] = duration
+    if failed:
+        stats[3] += 1
+
+def latency_table():
+    """Returns per-function latency lines for traced calls, slowest total first."""
+    rows = sorted(_STATS.items(), key=lambda item: item[1][1], reverse=True)
+    lines = [f"{'function':<60} {'calls':>7} {'mean ms':>9} {'max ms':>9} {'errors':>6}"]
+    for name, (calls, total, longest, errors) in rows:
+        if calls:
+            lines.append(f"{name:<60} {calls:>7} {total / calls * 1000:>9.2f} {longest * 1000:>9.2f} {errors:>6}")
+    return lines
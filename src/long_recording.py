@@ -0,0 +1,315 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib, GObject
+
+from .audio_devices import AudioDeviceMonitor
+from .gst_utils import UPLOAD_SUFFIX, encode_for_upload, get_float_list
+from .scheduler import PRIORITY_BACKGROUND
+from .journal import RecordingJournal, JournalError, JOURNAL_SUFFIX, HEADER, recover_journal
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CAPTURE_CAPS = f"audio/x-raw,format=S16LE,rate={SAMPLE_RATE},channels=1"
+
+# Start looking for a pause once a segment is this long...
+SEGMENT_TARGET_SECONDS = 480
+# ...and cut regardless at this length, 19.2 MB of 16 kHz PCM on disk until
+# it is cut and encoded to about 1.8 MB of Opus for upload
+SEGMENT_MAX_SECONDS = 600
+# Target for recordings that stream partial text: the first pause after
+# this long, so partials arrive sentence by sentence
+PARTIAL_SEGMENT_SECONDS = 4
+SILENCE_DB = -40.0
+SILENCE_HOLD_SECONDS = 0.3
+SEGMENT_JOBS = 2
+LEVEL_INTERVAL = 0.1
+
+
+def get_recordings_dir():
+    return os.path.join(GLib.get_user_data_dir(), "whis", "recordings")
+
+
+def is_session_dir(path):
+    """Actions take session paths over D-Bus, so only accept ones inside the recordings dir."""
+    return os.path.isdir(path) and os.path.dirname(os.path.realpath(path)) == os.path.realpath(get_recordings_dir())
+
+
+def find_unfinished_sessions():
+    """Returns session directories left behind by a crash, removing empty ones."""
+    recordings_dir = get_recordings_dir()
+    try:
+        names = sorted(os.listdir(recordings_dir))
+    except FileNotFoundError:
+        return []
+    sessions = []
+    for name in names:
+        path = os.path.join(recordings_dir, name)
+        if not os.path.isdir(path):
+            continue
+        if any(f.endswith((JOURNAL_SUFFIX, ".wav", UPLOAD_SUFFIX)) for f in os.listdir(path)):
+            sessions.append(path)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+    return sessions
+
+
+class LongRecorder(GObject.Object):
+    """
+    Records dictations of any length in constant memory.
+
+    Captured 16 kHz PCM goes straight from an appsink into memory-mapped
+    segment journals in a session directory, which survive a crash and
+    become WAV files with a rename when cut. Once a segment passes segment_target it is
+    cut at the next pause, or at SEGMENT_MAX_SECONDS at the latest, and
+    handed to a small pool that encodes it to Ogg Opus, the same upload
+    format batch transcription uses, and transcribes it while recording
+    goes on. The texts are stitched in order when recording stops.
+    """
+
+    __gtype_name__ = "LongRecorder"
+
+    __gsignals__ = {
+        'segment': (GObject.SignalFlags.RUN_FIRST, None, (int, float)),
+        # RMS level in dB, every LEVEL_INTERVAL while recording
+        'level': (GObject.SignalFlags.RUN_FIRST, None, (float,)),
+        # Text of the leading segments transcribed so far
+        'partial': (GObject.SignalFlags.RUN_FIRST, None, (str,)),
+        'finished': (GObject.SignalFlags.RUN_FIRST, None, (str,)),
+        'failed': (GObject.SignalFlags.RUN_FIRST, None, (str,)),
+    }
+
+    def __init__(self, client, device_id="", priority=PRIORITY_BACKGROUND, segment_target=SEGMENT_TARGET_SECONDS):
+        super().__init__()
+        self.client = client
+        self.device_id = device_id
+        self.priority = priority
+        self.segment_target = segment_target
+        self.spill_dir = None
+        self.pipeline = None
+        self.executor = None
+        self.futures = []
+        self.journal = None
+        self.segment_path = None
+        # Seconds of continuous silence reported by the level element
+        self.quiet_seconds = 0.0
+        self.partial_segments = 0
+        # Guards the journal between the streaming thread and stop()
+        self.lock = threading.Lock()
+        self.cancelled = False
+
+    @classmethod
+    def recover(cls, client, session_dir):
+        """Transcribes the segments of a session interrupted by a crash."""
+        recorder = cls(client)
+        recorder.spill_dir = session_dir
+        recorder.executor = ThreadPoolExecutor(max_workers=SEGMENT_JOBS, thread_name_prefix="whis-segment")
+        names = sorted(os.listdir(session_dir))
+        for name in names:
+            path = os.path.join(session_dir, name)
+            if name.endswith(UPLOAD_SUFFIX):
+                # Encoded before the crash; its duration only serves scheduling
+                duration = None
+            elif name.endswith(JOURNAL_SUFFIX):
+                destination = path[:-len(JOURNAL_SUFFIX)] + ".wav"
+                try:
+                    duration = recover_journal(path, destination)
+                except (JournalError, OSError) as e:
+                    logger.error(f"Failed to recover {path}: {e}")
+                    continue
+                path = destination
+            elif name.endswith(".wav"):
+                if name[:-len(".wav")] + UPLOAD_SUFFIX in names:
+                    # Already encoded, only the WAV was not removed yet
+                    continue
+                duration = (os.path.getsize(path) - HEADER.size) / (SAMPLE_RATE * SAMPLE_WIDTH)
+            else:
+                continue
+            recorder.futures.append(recorder.executor.submit(recorder.transcribe_segment, path, duration))
+        logger.info(f"Recovering {len(recorder.futures)} segment(s) from {session_dir}")
+        threading.Thread(target=recorder.collect, name="whis-long-collect", daemon=True).start()
+        return recorder
+
+    def start(self):
+        recordings_dir = get_recordings_dir()
+        os.makedirs(recordings_dir, exist_ok=True)
+        self.spill_dir = tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=recordings_dir)
+        self.executor = ThreadPoolExecutor(max_workers=SEGMENT_JOBS, thread_name_prefix="whis-segment")
+
+        self.pipeline = Gst.Pipeline.new("long-recording")
+        source = AudioDeviceMonitor.get_default().create_source(self.device_id)
+        convert = Gst.ElementFactory.make("audioconvert", None)
+        resample = Gst.ElementFactory.make("audioresample", None)
+        capsfilter = Gst.ElementFactory.make("capsfilter", None)
+        capsfilter.set_property("caps", Gst.Caps.from_string(CAPTURE_CAPS))
+        level = Gst.ElementFactory.make("level", None)
+        level.set_property("interval", int(LEVEL_INTERVAL * Gst.SECOND))
+        sink = Gst.ElementFactory.make("appsink", None)
+        sink.set_property("emit-signals", True)
+        sink.set_property("sync", False)
+        # Bounded queue: a stalled disk blocks capture instead of growing memory
+        sink.set_property("max-buffers", 64)
+        sink.connect("new-sample", self.on_new_sample)
+
+        elements = (source, convert, resample, capsfilter, level, sink)
+        for element in elements:
+            self.pipeline.add(element)
+        for upstream, downstream in zip(elements, elements[1:]):
+            upstream.link(downstream)
+
+        bus = self.pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::eos", self.on_eos)
+        bus.connect("message::error", self.on_error)
+        bus.connect("message::element", self.on_element_message)
+
+        self.open_segment()
+        self.pipeline.set_state(Gst.State.PLAYING)
+        logger.info(f"Long recording started, spilling to {self.spill_dir}")
+
+    def open_segment(self):
+        self.segment_path = os.path.join(self.spill_dir, f"segment-{len(self.futures):04}.wav")
+        self.journal = RecordingJournal(self.segment_path + JOURNAL_SUFFIX, SAMPLE_RATE)
+
+    def close_segment(self):
+        """Commits the current segment and queues it for transcription."""
+        journal, self.journal = self.journal, None
+        duration = journal.duration
+        if journal.length == 0:
+            journal.discard()
+            return
+        journal.finish(self.segment_path)
+        index = len(self.futures)
+        future = self.executor.submit(self.transcribe_segment, self.segment_path, duration)
+        future.add_done_callback(lambda f: GLib.idle_add(self.on_segment_done))
+        self.futures.append(future)
+        logger.debug(f"Segment {index} cut at {duration:.1f}s")
+        GLib.idle_add(self.emit, "segment", index, duration)
+
+    def on_element_message(self, bus, message):
+        structure = message.get_structure()
+        if structure is not None and structure.get_name() == "level":
+            rms = get_float_list(structure, "rms")
+            if rms:
+                level = max(rms)
+                self.quiet_seconds = self.quiet_seconds + LEVEL_INTERVAL if level < SILENCE_DB else 0.0
+                self.emit("level", level)
+
+    def on_segment_done(self):
+        texts = []
+        for future in self.futures:
+            if not future.done() or future.cancelled() or future.exception() is not None:
+                break
+            texts.append(future.result().strip())
+        if len(texts) > self.partial_segments:
+            self.partial_segments = len(texts)
+            self.emit("partial", " ".join(t for t in texts if t))
+        return False
+
+    def on_new_sample(self, sink):
+        # Runs on the GStreamer streaming thread
+        sample = sink.emit("pull-sample")
+        buffer = sample.get_buffer()
+        ok, info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            return Gst.FlowReturn.ERROR
+        try:
+            data = bytes(info.data)
+        finally:
+            buffer.unmap(info)
+
+        with self.lock:
+            if self.journal is None:
+                return Gst.FlowReturn.EOS
+            self.journal.append(data)
+
+            # Pauses come from the pipeline's level element via the bus
+            duration = self.journal.duration
+            if duration >= self.segment_target:
+                if self.quiet_seconds >= SILENCE_HOLD_SECONDS or duration >= SEGMENT_MAX_SECONDS:
+                    self.close_segment()
+                    self.open_segment()
+        return Gst.FlowReturn.OK
+
+    def transcribe_segment(self, path, duration):
+        if self.cancelled:
+            return ""
+        if path.endswith(".wav"):
+            wav_path, path = path, encode_for_upload(path, path[:-len(".wav")] + UPLOAD_SUFFIX, duration)
+            try:
+                os.unlink(wav_path)
+            except OSError as e:
+                logger.warning(f"Failed to remove encoded segment {wav_path}: {e}")
+        text = self.client.transcribe(path, self.priority, duration).text
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logger.warning(f"Failed to remove transcribed segment {path}: {e}")
+        return text
+
+    def stop(self):
+        """Finishes the recording; 'finished' is emitted once all segments are transcribed."""
+        if self.pipeline is not None:
+            self.pipeline.send_event(Gst.Event.new_eos())
+
+    def cancel(self):
+        self.cancelled = True
+        self.shutdown_pipeline()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def shutdown_pipeline(self):
+        if self.pipeline is None:
+            return
+        self.pipeline.set_state(Gst.State.NULL)
+        self.pipeline.get_bus().remove_signal_watch()
+        self.pipeline = None
+        with self.lock:
+            if self.journal is not None:
+                if self.cancelled:
+                    self.journal.discard()
+                    self.journal = None
+                else:
+                    self.close_segment()
+
+    def on_eos(self, bus, message):
+        self.shutdown_pipeline()
+        threading.Thread(target=self.collect, name="whis-long-collect", daemon=True).start()
+
+    def on_error(self, bus, message):
+        error, debug = message.parse_error()
+        logger.error(f"Long recording failed: {error.message} ({debug})")
+        # Whatever was captured so far is still transcribed
+        self.on_eos(bus, message)
+
+    def collect(self):
+        texts = []
+        failed = 0
+        for index, future in enumerate(self.futures):
+            # Anything a segment raises, including cancellation, must not stop
+            # 'finished' from being emitted or the dictation queue stalls
+            try:
+                texts.append(future.result())
+            except Exception as e:
+                failed += 1
+                logger.error(f"Segment {index} failed, audio kept in {self.spill_dir}: {e}")
+        self.executor.shutdown()
+        if failed:
+            GLib.idle_add(self.emit, "failed", f"{failed} of {len(self.futures)} segments failed to transcribe")
+        else:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        text = " ".join(t.strip() for t in texts if t.strip())
+        GLib.idle_add(self.emit, "finished", text)
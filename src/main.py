@@ -3,9 +3,12 @@
 
 import sys
 import os
-import subprocess
-import threading
+import gc
+import time
+import sqlite3
 import signal
+import shutil
+import threading
 
 import gi
 import logging
@@ -18,7 +21,24 @@ from gi.repository import Gtk, Gio, Granite, Gdk, GLib, Gst
 
 from .window import whisWindow
 from .config_manager import ConfigManager
-from .logging_utils import set_verbose_logging, log_function_calls
+from .daemon import HyprvoiceDaemon
+from .diagnostics import DiagnosticsWindow
+from .profiler import Profiler, get_rss
+from .audio_devices import AudioDeviceMonitor
+from .history import HistoryStore, HistoryWindow
+from .batch import BatchTranscriber, BatchError, is_batch_invocation, parse_batch_args
+from .transcription import TranscriptionClient, TranscriptionError
+from .long_recording import LongRecorder, find_unfinished_sessions, is_session_dir
+from .dictation import DictationQueue
+from .injection import Injector
+from .vocabulary import Vocabulary
+from .api import DictationServer
+from .logging_utils import set_verbose_logging, log_function_calls, setup_logging, shutdown_logging, set_logger_levels, set_sample_rate, get_verbose_logging, latency_table
+
+logger = logging.getLogger(__name__)
+
+# Target for rebuilding the UI after it was released in hidden mode
+REHYDRATE_BUDGET_MS = 150
 
 
 class Application(Gtk.Application):
@@ -31,56 +51,81 @@ class Application(Gtk.Application):
     def __init__(self):
         super().__init__(application_id=self.app_id,
                          flags=Gio.ApplicationFlags.FLAGS_NONE | Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
-        self.hyprvoice_process = None
+        self.daemon = HyprvoiceDaemon(is_busy=lambda: self.window is not None and self.window.recording)
         self.window = None
-
-    def _log_pipe(self, pipe, prefix):
-        """Reads lines from a pipe and logs them."""
-        with pipe:
-            for line in iter(pipe.readline, ""):
-                if line:
-                    logging.debug(f"hyprvoice: {line.strip()}")
+        self.diagnostics_window = None
+        self.preferences_window = None
+        self.history_window = None
+        self.profiler = Profiler()
+        self.teardown_source = None
+        self.torn_down = False
+        # Batch transcription runs without window or daemon
+        self.headless = is_batch_invocation(sys.argv)
+        self.batch = None
+        self.exit_status = 0
+        self.long_recorder = None
+        self.dictation = DictationQueue()
+        self.api_server = DictationServer(self)
+        self.injector = Injector(on_not_pasted=self.on_injection_not_pasted)
 
     @log_function_calls
     def do_activate(self):
+        if self.headless:
+            logger.info("Ignoring activation while a batch transcription is running")
+            return
+        self.cancel_teardown()
         if not self.window:
+            start_time = time.perf_counter()
             self.window = whisWindow(application=self)
             self.window.present()
+            if self.torn_down:
+                self.torn_down = False
+                elapsed = (time.perf_counter() - start_time) * 1000
+                log = logger.warning if elapsed > REHYDRATE_BUDGET_MS else logger.info
+                log(f"UI rehydrated in {elapsed:.0f}ms (budget {REHYDRATE_BUDGET_MS}ms), RSS {get_rss() // 1024} KiB")
+        elif not self.window.get_visible():
+            self.window.present()
 
-    @log_function_calls
-    def start_daemon(self):
-        """Starts the hyprvoice daemon if not already running."""
-        if self.hyprvoice_process and self.hyprvoice_process.poll() is None:
-            return
-
-        try:
-            # Clean up stale PID file
-            pid_path = os.path.expanduser("~/.cache/hyprvoice/hyprvoice.pid")
-            xdg_cache = os.environ.get('XDG_CACHE_HOME')
-            
-            if xdg_cache:
-                 pid_path_xdg = os.path.join(xdg_cache, "hyprvoice", "hyprvoice.pid")
-                 if os.path.exists(pid_path_xdg):
-                      pid_path = pid_path_xdg
-
-            if os.path.exists(pid_path):
-                logging.info(f"Removing stale PID file: {pid_path}")
-                os.remove(pid_path)
-
-            self.hyprvoice_process = subprocess.Popen(
-                ["hyprvoice", "serve"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # Start background threads to capture and log output
-            threading.Thread(target=self._log_pipe, args=(self.hyprvoice_process.stdout, "stdout"), daemon=True).start()
-            threading.Thread(target=self._log_pipe, args=(self.hyprvoice_process.stderr, "stderr"), daemon=True).start()
-            
-        except Exception as e:
-            logging.error(f"Failed to start hyprvoice: {e}")
-            self.hyprvoice_process = None
+    def schedule_teardown(self):
+        """Releases the hidden UI after the configured idle time."""
+        self.cancel_teardown()
+        idle = self.gio_settings.get_int("idle-teardown")
+        if idle > 0:
+            self.teardown_source = GLib.timeout_add_seconds(idle, self.on_teardown_timeout)
+
+    def cancel_teardown(self):
+        if self.teardown_source is not None:
+            GLib.source_remove(self.teardown_source)
+            self.teardown_source = None
+
+    def on_teardown_timeout(self):
+        if self.window is None or self.window.get_visible():
+            self.teardown_source = None
+            return False
+        if self.window.recording:
+            # Try again after the next interval
+            return True
+
+        self.teardown_source = None
+        rss_before = get_rss()
+        self.window.release()
+        self.window.destroy()
+        self.window = None
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.destroy()
+            self.diagnostics_window = None
+        if self.preferences_window is not None:
+            self.preferences_window.destroy()
+            self.preferences_window = None
+        if self.history_window is not None:
+            self.history_window.destroy()
+            self.history_window = None
+        if AudioDeviceMonitor._default is not None:
+            AudioDeviceMonitor._default.stop()
+        gc.collect()
+        self.torn_down = True
+        logger.info(f"UI released after idle, RSS {rss_before // 1024} KiB -> {get_rss() // 1024} KiB")
+        return False
 
     def do_startup(self):
         # Configure logging
@@ -88,50 +133,83 @@ class Application(Gtk.Application):
         os.makedirs(log_dir, exist_ok=True)
         log_file = os.path.join(log_dir, "whis.log")
         
-        # Primary logging config
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s %(levelname)s: %(message)s',
-            datefmt='%Y/%m/%d %H:%M:%S',
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler(log_file)
-            ]
-        )
-
-        Gtk.Application.do_startup(self)
+        # Primary logging config, written from a background thread
+        setup_logging(log_file)
+
+        if self.headless:
+            # Batch runs need no display, which GTK's startup would open
+            Gio.Application.do_startup(self)
+        else:
+            Gtk.Application.do_startup(self)
         Gst.init(None)
 
         # Apply logging level from config
         try:
-            config = ConfigManager().get_config()
+            config = ConfigManager.get_default().get_config()
             debug_enabled = config.get("logging", {}).get("debug", False) or "--debug" in sys.argv
             verbose_enabled = config.get("logging", {}).get("verbose", False) or "--verbose" in sys.argv
             
             if debug_enabled or verbose_enabled:
                 logging.getLogger().setLevel(logging.DEBUG)
-                logging.debug(f"Debug logging enabled (debug={debug_enabled}, verbose={verbose_enabled})")
+                logger.debug(f"Debug logging enabled (debug={debug_enabled}, verbose={verbose_enabled})")
             
             set_verbose_logging(verbose_enabled)
+            set_logger_levels(config.get("logging", {}).get("levels", {}))
+            for module, rate in config.get("logging", {}).get("trace_sample", {}).items():
+                set_sample_rate(module, rate)
         except Exception as e:
-            logging.error(f"Failed to apply logging level: {e}")
-        
-        # Keep application alive even when window is closed
-        self.hold()
-
-        # Start hyprvoice service
-        self.start_daemon()
+            logger.error(f"Failed to apply logging level: {e}")
 
         # Handle termination signals
         GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGINT, self.quit)
         GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGTERM, self.quit)
-        
+
+        if self.headless:
+            return
+
+        # Keep application alive even when window is closed
+        self.hold()
+
+        # Start hyprvoice service and keep it in sync with config changes
+        self.daemon.start()
+        self.dictation.connect("ready", self.on_dictation_ready)
+        ConfigManager.get_default().connect("saved", self.on_config_saved)
+        self.gio_settings.connect("changed::local-api", self.on_local_api_changed)
+        self.on_local_api_changed(self.gio_settings, "local-api")
+
         # Support quiting app using Super+Q
         quit_action = Gio.SimpleAction.new("quit", None)
         quit_action.connect("activate", self.on_quit_action)
         self.add_action(quit_action)
         self.set_accels_for_action("app.quit", ["<Ctrl>Q", "Escape"])
 
+        diagnostics_action = Gio.SimpleAction.new("diagnostics", None)
+        diagnostics_action.connect("activate", self.on_diagnostics_action)
+        self.add_action(diagnostics_action)
+        self.set_accels_for_action("app.diagnostics", ["<Ctrl>L"])
+
+        history_action = Gio.SimpleAction.new("history", None)
+        history_action.connect("activate", self.on_history_action)
+        self.add_action(history_action)
+        self.set_accels_for_action("app.history", ["<Ctrl>H"])
+
+        profile_action = Gio.SimpleAction.new("profile", None)
+        profile_action.connect("activate", self.on_profile_action)
+        self.add_action(profile_action)
+
+        long_dictation_action = Gio.SimpleAction.new("long-dictation", None)
+        long_dictation_action.connect("activate", self.on_long_dictation_action)
+        self.add_action(long_dictation_action)
+        self.set_accels_for_action("app.long-dictation", ["<Ctrl><Shift>R"])
+
+        recover_action = Gio.SimpleAction.new("recover-recording", GLib.VariantType.new("s"))
+        recover_action.connect("activate", self.on_recover_recording_action)
+        self.add_action(recover_action)
+
+        discard_action = Gio.SimpleAction.new("discard-recording", GLib.VariantType.new("s"))
+        discard_action.connect("activate", self.on_discard_recording_action)
+        self.add_action(discard_action)
+
         prefers_color_scheme = self.granite_settings.get_prefers_color_scheme()
         self.gtk_settings.set_property("gtk-application-prefer-dark-theme", prefers_color_scheme)
         self.granite_settings.connect("notify::prefers-color-scheme", self.on_prefers_color_scheme)
@@ -139,6 +217,8 @@ class Application(Gtk.Application):
         if "io.elementary.stylesheet" not in self.gtk_settings.props.gtk_theme_name:
             self.gtk_settings.set_property("gtk-theme-name", "io.elementary.stylesheet.blueberry")
 
+        self.offer_recovery()
+
         # set CSS provider
         provider = Gtk.CssProvider()
         css_path = os.path.join(os.path.dirname(__file__), "data", "application.css")
@@ -156,11 +236,27 @@ class Application(Gtk.Application):
 
     
     @log_function_calls
+    def do_before_emit(self, platform_data):
+        # GTK's handler needs the display state its startup sets up
+        if self.headless:
+            Gio.Application.do_before_emit(self, platform_data)
+        else:
+            Gtk.Application.do_before_emit(self, platform_data)
+
+    def do_after_emit(self, platform_data):
+        if self.headless:
+            Gio.Application.do_after_emit(self, platform_data)
+        else:
+            Gtk.Application.do_after_emit(self, platform_data)
+
     def do_command_line(self, command_line):
         args = command_line.get_arguments()
-        
+
+        if is_batch_invocation(args):
+            return self.run_batch(command_line, args[1:])
+
         if "--toggle" in args:
-            logging.info("Command line: toggling hyprvoice")
+            logger.info("Command line: toggling hyprvoice")
             self.activate()
             if self.window:
                 self.window.toggle_recording()
@@ -168,44 +264,226 @@ class Application(Gtk.Application):
             return 0
 
         if "--cancel" in args:
-            logging.info("Command line: cancelling hyprvoice")
+            logger.info("Command line: cancelling hyprvoice")
             self.activate()
             if self.window:
                 self.window.cancel_recording()
                 self.window.present()
             return 0
             
+        if "--long-dictation" in args:
+            logger.info("Command line: toggling long dictation")
+            self.activate_action("long-dictation", None)
+            return 0
+
+        if "--profile" in args:
+            logger.info("Command line: toggling profiler")
+            self.activate_action("profile", None)
+
         if "--debug" in args:
-            logging.info("Command line: enabling debug logging")
+            logger.info("Command line: enabling debug logging")
             logging.getLogger().setLevel(logging.DEBUG)
 
         if "--verbose" in args:
-            logging.info("Command line: enabling verbose logging")
+            logger.info("Command line: enabling verbose logging")
             set_verbose_logging(True)
 
         self.activate()
         return 0
 
+    def run_batch(self, command_line, args):
+        try:
+            options = parse_batch_args(args, command_line.get_cwd() or os.getcwd())
+            client = TranscriptionClient.from_config(ConfigManager.get_default().get_settings().transcription)
+        except (BatchError, TranscriptionError) as e:
+            self.print_command_line(command_line, str(e), error=True)
+            return 2
+        if not client.api_key:
+            self.print_command_line(command_line, f"No API key configured for {client.provider}", error=True)
+            return 2
+
+        logger.info(f"Command line: transcribing {len(options.files)} file(s) to {options.output}")
+        report = lambda message: GLib.idle_add(self.print_command_line, command_line, message)
+        self.batch = BatchTranscriber(options, client, report)
+        self.hold()
+
+        def worker():
+            status = self.batch.run()
+            GLib.idle_add(self.on_batch_finished, command_line, status)
+
+        threading.Thread(target=worker, name="whis-batch", daemon=True).start()
+        return 0
+
+    def on_batch_finished(self, command_line, status):
+        # Local invocations that held the application always exit with 0,
+        # so main() picks exit_status up instead
+        self.exit_status = status
+        command_line.set_exit_status(status)
+        self.batch = None
+        self.release()
+        return False
+
+    def print_command_line(self, command_line, message, error=False):
+        """Prints to the terminal that invoked whis, even when it is a remote instance."""
+        if not command_line.get_is_remote():
+            print(message, file=sys.stderr if error else sys.stdout, flush=True)
+        elif hasattr(command_line, "print_literal"):
+            (command_line.printerr_literal if error else command_line.print_literal)(message + "\n")
+        else:
+            logger.info(message)
+        return False
+
+    def on_config_saved(self, config_manager, version):
+        self.daemon.request_reload(version)
+
+    def on_diagnostics_action(self, action, param):
+        if self.diagnostics_window is None:
+            self.diagnostics_window = DiagnosticsWindow(self)
+        self.diagnostics_window.present()
+
+    def on_history_action(self, action, param):
+        if self.history_window is None:
+            self.history_window = HistoryWindow(self)
+        self.history_window.present()
+
+    def record_transcript(self, text, latency, source="dictation"):
+        transcription = ConfigManager.get_default().get_settings().transcription.synced()
+        try:
+            HistoryStore.get_default().add(text, transcription.provider, transcription.model, latency, source)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record transcript: {e}")
+        if self.history_window is not None and self.history_window.get_visible():
+            self.history_window.model.reload()
+
+    def on_dictation_ready(self, dictation, text, latency):
+        text = Vocabulary.get_default().apply(text)
+        self.record_transcript(text, latency)
+        settings = ConfigManager.get_default().get_settings()
+        self.injector.inject(text, settings.injection, self.gio_settings.get_boolean("adaptive-injection"))
+
+    def on_injection_not_pasted(self, text, error):
+        # Called on the injection thread
+        if error.on_clipboard:
+            title, body = "Transcript left on the clipboard", "It could not be pasted and was not typed because of its line breaks or tabs."
+        else:
+            title, body = "Transcript not inserted", "It could not be pasted without losing the clipboard. It is kept in History."
+        GLib.idle_add(self.show_notification, title, body, "injection")
+
+    def on_local_api_changed(self, settings, key):
+        if settings.get_boolean(key):
+            self.api_server.start()
+        else:
+            self.api_server.stop()
+
+    def on_long_dictation_action(self, action, param):
+        if self.long_recorder is not None:
+            self.long_recorder.stop()
+            self.show_notification("Long dictation stopped, transcribing…")
+            return
+
+        try:
+            client = TranscriptionClient.from_config(ConfigManager.get_default().get_settings().transcription)
+        except TranscriptionError as e:
+            logger.error(f"Cannot start long dictation: {e}")
+            return
+        self.long_recorder = LongRecorder(client, self.gio_settings.get_string("audio-device"))
+        self.long_recorder.connect("finished", self.on_long_dictation_finished)
+        self.long_recorder.connect("failed", self.on_long_dictation_failed)
+        self.long_recorder.start()
+        self.show_notification("Long dictation started")
+
+    def on_long_dictation_finished(self, recorder, text):
+        if recorder is self.long_recorder:
+            self.long_recorder = None
+        if not text:
+            return
+        text = Vocabulary.get_default().apply(text)
+        transcription = recorder.client
+        try:
+            HistoryStore.get_default().add(text, transcription.provider, transcription.model, source="long")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record transcript: {e}")
+        Gdk.Display.get_default().get_clipboard().set(text)
+        self.show_notification("Long dictation copied to clipboard", text[:200])
+
+    def on_long_dictation_failed(self, recorder, message):
+        logger.error(f"Long dictation: {message}")
+        self.show_notification("Long dictation incomplete", message)
+
+    def offer_recovery(self):
+        """Offers to transcribe dictations that were interrupted by a crash."""
+        for session_dir in find_unfinished_sessions():
+            logger.info(f"Found unfinished recording in {session_dir}")
+            target = GLib.Variant.new_string(session_dir)
+            notification = Gio.Notification.new("Unfinished dictation found")
+            notification.set_body("whis stopped while recording. Transcribe what was captured?")
+            notification.add_button_with_target("Transcribe", "app.recover-recording", target)
+            notification.add_button_with_target("Discard", "app.discard-recording", target)
+            self.send_notification(f"recover-{os.path.basename(session_dir)}", notification)
+
+    def on_recover_recording_action(self, action, param):
+        session_dir = param.get_string()
+        if not is_session_dir(session_dir):
+            return
+        try:
+            client = TranscriptionClient.from_config(ConfigManager.get_default().get_settings().transcription)
+        except TranscriptionError as e:
+            logger.error(f"Cannot recover {session_dir}: {e}")
+            return
+        recorder = LongRecorder.recover(client, session_dir)
+        recorder.connect("finished", self.on_long_dictation_finished)
+        recorder.connect("failed", self.on_long_dictation_failed)
+
+    def on_discard_recording_action(self, action, param):
+        session_dir = param.get_string()
+        if not is_session_dir(session_dir):
+            return
+        logger.info(f"Discarding unfinished recording {session_dir}")
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+    def show_notification(self, title, body=None, notification_id="long-dictation"):
+        notification = Gio.Notification.new(title)
+        if body:
+            notification.set_body(body)
+        self.send_notification(notification_id, notification)
+
+    def on_profile_action(self, action, param):
+        self.profiler.toggle()
+
     def on_quit_action(self, action, param):
-        logging.info("on_quit_action triggered.")
+        logger.info("on_quit_action triggered.")
         self.quit()
         
     @log_function_calls
     def do_shutdown(self):
-        logging.info("Shutting down...")
+        logger.info("Shutting down...")
 
+        self.cancel_teardown()
         if self.window is not None:
-            self.window.close()
-
-        if self.hyprvoice_process:
-            logging.info("Terminating hyprvoice daemon")
-            self.hyprvoice_process.terminate()
-            try:
-                self.hyprvoice_process.wait(timeout=2)
-            except subprocess.TimeoutExpired:
-                self.hyprvoice_process.kill()
-        
-        Gtk.Application.do_shutdown(self)
+            self.window.release()
+            self.window.destroy()
+
+        if self.batch is not None:
+            self.batch.cancel()
+        if self.long_recorder is not None:
+            self.long_recorder.cancel()
+        self.api_server.stop()
+        self.dictation.cancel_all()
+        self.daemon.stop()
+        self.profiler.stop()
+        if HistoryStore._default is not None:
+            HistoryStore._default.close()
+        if AudioDeviceMonitor._default is not None:
+            AudioDeviceMonitor._default.stop()
+
+        if get_verbose_logging():
+            logger.info("Traced call latencies:\n" + "\n".join(latency_table()))
+
+        if self.headless:
+            Gio.Application.do_shutdown(self)
+        else:
+            Gtk.Application.do_shutdown(self)
+        shutdown_logging()
 
     def on_prefers_color_scheme(self, *args):
         prefers_color_scheme = self.granite_settings.get_prefers_color_scheme()
@@ -213,4 +491,5 @@ class Application(Gtk.Application):
 
 def main(version):
     app = Application()
-    return app.run(sys.argv)
+    status = app.run(sys.argv)
+    return status or app.exit_status
@@ -4,8 +4,29 @@
 
 import gi
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, Gdk, GObject
+from gi.repository import Gtk, Gdk, GObject, GLib
 from .config_manager import ConfigManager
+from .audio_devices import AudioDeviceMonitor
+from .config_schema import OPENAI_MODELS, GROQ_MODELS, INJECTION_MODES
+
+VISUALIZER_MODES = ("waveform", "spectrum")
+DICTATION_ENGINES = ("hyprvoice", "whis")
+
+# Maps each settings row to its (section, key) in config.toml
+SETTINGS_FIELDS = {
+    "provider": ("transcription", "provider"),
+    "openai-api-key": ("transcription", "openai_api_key"),
+    "openai-model": ("transcription", "openai_model"),
+    "groq-api-key": ("transcription", "groq_api_key"),
+    "groq-model": ("transcription", "groq_model"),
+    "language": ("transcription", "language"),
+    "timeout": ("recording", "timeout"),
+    "injection-mode": ("injection", "mode"),
+    "restore-clipboard": ("injection", "restore_clipboard"),
+    "notifications": ("notifications", "enabled"),
+    "debug-logging": ("logging", "debug"),
+    "verbose-logging": ("logging", "verbose"),
+}
 
 class PreferencesWindow(Gtk.Window):
     def __init__(self, parent):
@@ -14,15 +35,17 @@ class PreferencesWindow(Gtk.Window):
         self.set_default_size(500, 600)
         self.set_modal(True)
         self.set_resizable(False)
+        # Reused across opens; see whisWindow.on_preferences_clicked
+        self.set_hide_on_close(True)
 
         self.app = parent.app
         self.loading = True
-        self.config_manager = ConfigManager()
+        self.config_manager = ConfigManager.get_default()
 
         # Scrolled Window
         self.scrolled_window = Gtk.ScrolledWindow()
         self.scrolled_window.set_vexpand(True)
-        self.scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.NEVER)
+        self.scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         self.set_child(self.scrolled_window)
 
         # Main Box
@@ -58,7 +81,7 @@ class PreferencesWindow(Gtk.Window):
             label="OpenAI Model",
             sublabel="Choose model (whisper-1 is standard)",
             separator=True,
-            params=(["whisper-1", "gpt-4o-transcribe", "gpt-4o-mini-transcribe"],)
+            params=(list(OPENAI_MODELS),)
         )
 
         # Groq specific settings
@@ -76,7 +99,7 @@ class PreferencesWindow(Gtk.Window):
             label="Groq Model",
             sublabel="Performance vs Speed",
             separator=True,
-            params=(["whisper-large-v3", "whisper-large-v3-turbo"],)
+            params=(list(GROQ_MODELS),)
         )
 
         self.language_setting = SubSettings(
@@ -101,6 +124,33 @@ class PreferencesWindow(Gtk.Window):
         self.on_provider_changed(self.provider_setting.dropdown, None)
 
         # --- Behavior Section ---
+        self.audio_device_setting = SubSettings(
+            type="dropdown",
+            name="audio-device",
+            label="Microphone",
+            sublabel="Input used by whis for the level meter",
+            separator=True,
+            params=(["System Default"],)
+        )
+
+        self.visualizer_setting = SubSettings(
+            type="dropdown",
+            name="visualizer-mode",
+            label="Visualizer",
+            sublabel="Scrolling level or frequency spectrum",
+            separator=True,
+            params=(["Waveform", "Spectrum"],)
+        )
+
+        self.dictation_engine_setting = SubSettings(
+            type="dropdown",
+            name="dictation-engine",
+            label="Dictation Engine",
+            sublabel="Built-in allows back-to-back dictations",
+            separator=True,
+            params=(["hyprvoice", "Built-in"],)
+        )
+
         timeout_setting = SubSettings(
             type="spinbutton",
             name="timeout",
@@ -116,7 +166,15 @@ class PreferencesWindow(Gtk.Window):
             label="Injection Mode",
             sublabel="How text is inserted into active window",
             separator=True,
-            params=(["fallback", "clipboard", "type"],)
+            params=(list(INJECTION_MODES),)
+        )
+
+        self.adaptive_injection_setting = SubSettings(
+            type="switch",
+            name="adaptive-injection",
+            label="Adaptive Injection",
+            sublabel="Type short text, paste long text (built-in engine)",
+            separator=True
         )
 
         restore_clipboard = SubSettings(
@@ -127,10 +185,56 @@ class PreferencesWindow(Gtk.Window):
             separator=False
         )
 
-        behavior_group = SettingsGroup("Behavior", (timeout_setting, injection_mode, restore_clipboard))
+        behavior_group = SettingsGroup("Behavior", (self.audio_device_setting, self.visualizer_setting, self.dictation_engine_setting, timeout_setting, injection_mode, self.adaptive_injection_setting, restore_clipboard))
         self.main_box.append(behavior_group)
 
         # --- System Section ---
+        # Rarely used, so it is only built once scrolled into view
+        self.system_placeholder = Gtk.Box()
+        self.local_api_setting = None
+        self.system_placeholder.set_size_request(-1, 220)
+        self.main_box.append(self.system_placeholder)
+        vadjustment = self.scrolled_window.get_vadjustment()
+        self.lazy_handlers = [
+            vadjustment.connect("changed", self.on_scrolled),
+            vadjustment.connect("value-changed", self.on_scrolled),
+        ]
+
+        # Connect all settings for auto-save
+        self.all_subsettings = []
+        for group in (transcription_group, behavior_group):
+            self.add_group_settings(group)
+
+        self.device_monitor = AudioDeviceMonitor.get_default()
+        self.device_ids = [""]
+        self.load_devices()
+        self.load_settings()
+        self.loading = False
+
+        # Reflect edits made outside this window while it is open
+        self.config_handler = self.config_manager.connect("changed", self.on_config_changed)
+        self.devices_handler = self.device_monitor.connect("devices-changed", self.on_devices_changed)
+        self.connect("destroy", self.on_destroy)
+
+    def add_group_settings(self, group):
+        for subsetting in group.subsettings:
+            self.all_subsettings.append(subsetting)
+            subsetting.connect("changed", self.on_setting_changed)
+
+    def on_scrolled(self, adjustment):
+        ok, bounds = self.system_placeholder.compute_bounds(self.scrolled_window)
+        if ok and bounds.get_y() < self.scrolled_window.get_height():
+            # Defer so the group isn't added while the scrolled window is laid out
+            GLib.idle_add(self.build_system_group)
+
+    def build_system_group(self):
+        if self.system_placeholder is None:
+            return False
+
+        vadjustment = self.scrolled_window.get_vadjustment()
+        for handler in self.lazy_handlers:
+            vadjustment.disconnect(handler)
+
         notif_setting = SubSettings(
             type="switch",
             name="notifications",
@@ -152,149 +256,105 @@ class PreferencesWindow(Gtk.Window):
             name="verbose-logging",
             label=None,
             sublabel=None,
-            separator=False,
+            separator=True,
             params=("Verbose logging",)
         )
 
-        system_group = SettingsGroup("System", (notif_setting, logging_setting, verbose_logging_setting))
-        self.main_box.append(system_group)
+        self.local_api_setting = SubSettings(
+            type="switch",
+            name="local-api",
+            label="Local Dictation API",
+            sublabel="Let other apps start dictations over a private socket",
+            separator=False
+        )
+
+        system_group = SettingsGroup("System", (notif_setting, logging_setting, verbose_logging_setting, self.local_api_setting))
+        self.main_box.insert_child_after(system_group, self.system_placeholder)
+        self.main_box.remove(self.system_placeholder)
+        self.system_placeholder = None
 
-        # Connect all settings for auto-save
-        self.all_subsettings = []
-        for group in (transcription_group, behavior_group, system_group):
-            for subsetting in group.subsettings:
-                self.all_subsettings.append(subsetting)
-                subsetting.connect("changed", self.on_setting_changed)
+        self.add_group_settings(system_group)
+        self.loading = True
+        self.load_settings()
+        self.loading = False
+        return False
+
+    def refresh(self):
+        """Reloads GSettings rows, and config rows only if the cached config changed since the last load."""
+        self.loading = True
+        if self.config_manager.get_settings() is not self.loaded_settings:
+            self.load_settings()
+        else:
+            # GSettings can change behind our back, e.g. through `gsettings set`
+            self.load_gsettings()
+        self.loading = False
+
+    def load_devices(self):
+        devices = self.device_monitor.get_devices()
+        self.device_ids = [""] + [device_id for device_id, _ in devices]
+        self.audio_device_setting.set_options(["System Default"] + [name for _, name in devices])
 
+    def on_devices_changed(self, monitor):
+        self.loading = True
+        self.load_devices()
         self.load_settings()
         self.loading = False
 
+    def on_config_changed(self, config_manager):
+        # While hidden, catch up in refresh() when shown again
+        if self.get_visible():
+            self.refresh()
+
+    def on_destroy(self, window):
+        self.config_manager.disconnect(self.config_handler)
+        self.device_monitor.disconnect(self.devices_handler)
+
     def load_settings(self):
-        config = self.config_manager.get_config()
-        
-        # Helper to get nested config
-        def get_val(section, key, default=""):
-            return config.get(section, {}).get(key, default)
-
-        # Provider mapping
-        p_map = {"openai": 0, "groq-transcription": 1, "groq-translation": 2}
-        p_val = get_val("transcription", "provider", "openai")
-        self.provider_setting.set_value(p_map.get(p_val, 0))
-
-        # Transcription fields
-        openai_key = get_val("transcription", "openai_api_key", "")
-        openai_model = get_val("transcription", "openai_model", "whisper-1")
-        groq_key = get_val("transcription", "groq_api_key", "")
-        groq_model = get_val("transcription", "groq_model", "whisper-large-v3")
-        
-        # Fallback to general api_key/model if specialized keys are missing
-        if not openai_key and p_val == "openai":
-            openai_key = get_val("transcription", "api_key", "")
-        if not openai_model and p_val == "openai":
-            openai_model = get_val("transcription", "model", "whisper-1")
-            
-        if not groq_key and p_val.startswith("groq"):
-            groq_key = get_val("transcription", "api_key", "")
-        if not groq_model and p_val.startswith("groq"):
-            groq_model = get_val("transcription", "model", "whisper-large-v3")
-
-        self.openai_api_key.set_value(openai_key)
-        o_map = {"whisper-1": 0, "gpt-4o-transcribe": 1, "gpt-4o-mini-transcribe": 2}
-        self.openai_model.set_value(o_map.get(openai_model, 0))
-        self.groq_api_key.set_value(groq_key)
-        
-        g_map = {"whisper-large-v3": 0, "whisper-large-v3-turbo": 1}
-        self.groq_model.set_value(g_map.get(groq_model, 0))
-        
-        self.language_setting.set_value(get_val("transcription", "language", ""))
-
-        # Behavior
-        timeout_str = get_val("recording", "timeout", "10s")
-        try:
-            # Simple parser for "10s", "5m"
-            if timeout_str.endswith("s"):
-                t_val = int(timeout_str[:-1])
-            elif timeout_str.endswith("m"):
-                t_val = int(timeout_str[:-1]) * 60
-            else:
-                t_val = int(timeout_str)
-        except:
-            t_val = 10
-        
+        self.load_gsettings()
+
+        config = self.config_manager.get_settings()
+        self.loaded_settings = config
         for s in self.all_subsettings:
-            if s.name == "timeout":
-                s.set_value(t_val)
-            elif s.name == "injection-mode":
-                m_map = {"fallback": 0, "clipboard": 1, "type": 2}
-                s.set_value(m_map.get(get_val("injection", "mode", "fallback"), 0))
-            elif s.name == "restore-clipboard":
-                s.set_value(get_val("injection", "restore_clipboard", True))
-            elif s.name == "notifications":
-                s.set_value(get_val("notifications", "enabled", True))
-            elif s.name == "debug-logging":
-                s.set_value(get_val("logging", "debug", False))
-            elif s.name == "verbose-logging":
-                s.set_value(get_val("logging", "verbose", False))
+            if s.name in SETTINGS_FIELDS:
+                s.set_value(config.get_widget_value(*SETTINGS_FIELDS[s.name]))
+
+    def load_gsettings(self):
+        device_id = self.app.gio_settings.get_string("audio-device")
+        self.audio_device_setting.set_value(self.device_ids.index(device_id) if device_id in self.device_ids else 0)
+
+        self.visualizer_setting.set_value(VISUALIZER_MODES.index(self.app.gio_settings.get_string("visualizer-mode")))
+        self.dictation_engine_setting.set_value(DICTATION_ENGINES.index(self.app.gio_settings.get_string("dictation-engine")))
+        self.adaptive_injection_setting.set_value(self.app.gio_settings.get_boolean("adaptive-injection"))
+        if self.local_api_setting is not None:
+            self.local_api_setting.set_value(self.app.gio_settings.get_boolean("local-api"))
 
     def on_setting_changed(self, subsetting):
         if self.loading:
             return
 
-        updates = {}
-        
-        mapping = {
-            "provider": ("transcription", "provider"),
-            "openai-api-key": ("transcription", "openai_api_key"),
-            "openai-model": ("transcription", "openai_model"),
-            "groq-api-key": ("transcription", "groq_api_key"),
-            "groq-model": ("transcription", "groq_model"),
-            "language": ("transcription", "language"),
-            "timeout": ("recording", "timeout"),
-            "injection-mode": ("injection", "mode"),
-            "restore-clipboard": ("injection", "restore_clipboard"),
-            "notifications": ("notifications", "enabled"),
-            "debug-logging": ("logging", "debug"),
-            "verbose-logging": ("logging", "verbose")
-        }
-
-        if subsetting.name in mapping:
-            section, key = mapping[subsetting.name]
-            val = subsetting.get_value()
-
-            # Conversions
-            if subsetting.name == "provider":
-                p_list = ["openai", "groq-transcription", "groq-translation"]
-                val = p_list[val]
-            elif subsetting.name == "timeout":
-                val = f"{val}s"
-            elif subsetting.name == "injection-mode":
-                m_list = ["fallback", "clipboard", "type"]
-                val = m_list[val]
-            elif subsetting.name == "groq-model":
-                val = ["whisper-large-v3", "whisper-large-v3-turbo"][val]
-            elif subsetting.name == "openai-model":
-                val = ["whisper-1", "gpt-4o-transcribe", "gpt-4o-mini-transcribe"][val]
-
-            if section not in updates: updates[section] = {}
-            updates[section][key] = val
-
-            # Sync logic for the main api_key and model used by the daemon
-            if "transcription" not in updates:
-                updates["transcription"] = {}
-
-            prov_idx = self.provider_setting.get_value()
-            prov = ["openai", "groq-transcription", "groq-translation"][prov_idx]
-            
-            if prov == "openai":
-                updates["transcription"]["api_key"] = self.openai_api_key.get_value()
-                o_idx = self.openai_model.get_value()
-                updates["transcription"]["model"] = ["whisper-1", "gpt-4o-transcribe", "gpt-4o-mini-transcribe"][o_idx]
-            else:
-                updates["transcription"]["api_key"] = self.groq_api_key.get_value()
-                g_idx = self.groq_model.get_value()
-                updates["transcription"]["model"] = ["whisper-large-v3", "whisper-large-v3-turbo"][g_idx]
-
-            self.config_manager.save_config(updates)
+        # Whis-only settings live in GSettings rather than the daemon's config.toml
+        if subsetting.name == "audio-device":
+            self.app.gio_settings.set_string("audio-device", self.device_ids[subsetting.get_value()])
+            return
+        if subsetting.name == "visualizer-mode":
+            self.app.gio_settings.set_string("visualizer-mode", VISUALIZER_MODES[subsetting.get_value()])
+            return
+        if subsetting.name == "dictation-engine":
+            self.app.gio_settings.set_string("dictation-engine", DICTATION_ENGINES[subsetting.get_value()])
+            return
+        if subsetting.name == "adaptive-injection":
+            self.app.gio_settings.set_boolean("adaptive-injection", subsetting.get_value())
+            return
+        if subsetting.name == "local-api":
+            self.app.gio_settings.set_boolean("local-api", subsetting.get_value())
+            return
+
+        if subsetting.name not in SETTINGS_FIELDS:
+            return
+
+        section, key = SETTINGS_FIELDS[subsetting.name]
+        settings = self.config_manager.get_settings().with_widget_value(section, key, subsetting.get_value())
+        self.config_manager.save_settings(settings)
 
     def on_provider_changed(self, dropdown, pspec):
         selected_index = dropdown.get_selected()
@@ -406,6 +466,10 @@ class SubSettings(Gtk.Box):
             sep = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
             self.append(sep)
 
+    def set_options(self, options):
+        """Replaces the choices of a dropdown row."""
+        self.dropdown.set_model(Gtk.StringList.new(options))
+
     def get_value(self):
         if self.type == "switch":
             return self.widget.get_active()
@@ -420,6 +484,9 @@ class SubSettings(Gtk.Box):
         return None
 
     def set_value(self, value):
+        # Skip no-op updates so live refreshes don't reset cursors or re-emit
+        if self.get_value() == value:
+            return
         if self.type == "switch":
             self.widget.set_active(bool(value))
         elif self.type == "entry":
@@ -0,0 +1,94 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import io
+import os
+import time
+import pstats
+import cProfile
+import tracemalloc
+import logging
+
+from gi.repository import GLib
+
+logger = logging.getLogger(__name__)
+
+
+def get_rss():
+    """Returns the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class Profiler:
+    """
+    Captures a CPU profile and allocation snapshot from the running process.
+
+    cProfile only sees the thread it was enabled on, which is the GTK main
+    thread when started from an action or the command line.
+    """
+
+    TOP_N = 20
+    TRACEMALLOC_FRAMES = 10
+
+    def __init__(self):
+        self.profile = None
+        self.started_at = None
+        self.owns_tracemalloc = False
+
+    def is_running(self):
+        return self.profile is not None
+
+    def toggle(self):
+        if self.is_running():
+            return self.stop()
+        self.start()
+
+    def start(self):
+        if self.is_running():
+            return
+        logger.info("Profiling started")
+        self.started_at = time.perf_counter()
+        # Tracing started elsewhere, e.g. by PYTHONTRACEMALLOC, is left running on stop
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc:
+            tracemalloc.start(self.TRACEMALLOC_FRAMES)
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """Stops profiling and returns the path prefix of the dumped files."""
+        if not self.is_running():
+            return None
+
+        self.profile.disable()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self.owns_tracemalloc:
+            tracemalloc.stop()
+        duration = time.perf_counter() - self.started_at
+
+        profile_dir = os.path.join(GLib.get_user_data_dir(), "whis", "profiles")
+        os.makedirs(profile_dir, exist_ok=True)
+        prefix = os.path.join(profile_dir, time.strftime("%Y%m%d-%H%M%S"))
+
+        try:
+            self.profile.dump_stats(f"{prefix}.pstats")
+            snapshot.dump(f"{prefix}.tracemalloc")
+        except OSError as e:
+            logger.error(f"Failed to write profile: {e}")
+
+        summary = io.StringIO()
+        pstats.Stats(self.profile, stream=summary).sort_stats("cumulative").print_stats(self.TOP_N)
+        allocations = "\n".join(str(stat) for stat in snapshot.statistics("lineno")[:self.TOP_N])
+        logger.info(f"Profile of {duration:.1f}s saved to {prefix}.pstats\n{summary.getvalue()}")
+        logger.info(f"Top {self.TOP_N} allocations saved to {prefix}.tracemalloc\n{allocations}")
+
+        self.profile = None
+        self.started_at = None
+        return prefix
@@ -0,0 +1,262 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import re
+import time
+import heapq
+import random
+import itertools
+import threading
+import logging
+from collections import deque
+
+from .frame_stats import percentile
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 5
+PRIORITY_BATCH = 10
+
+# Limits whis never exceeds, which the provider's headers can lower:
+# (requests per minute, audio seconds per hour)
+DEFAULT_LIMITS = {
+    "openai": (50, None),
+    "groq-transcription": (20, 7200),
+    "groq-translation": (20, 7200),
+}
+
+# Window in seconds each provider documents for its x-ratelimit-*-<suffix>
+# headers. Groq's request headers count per day, OpenAI's per minute.
+HEADER_WINDOWS = {
+    "openai": {"requests": 60},
+    "groq-transcription": {"requests": 86400, "audio-seconds": 3600},
+    "groq-translation": {"requests": 86400, "audio-seconds": 3600},
+}
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+
+def parse_reset(value):
+    """Parses rate-limit reset values such as "1s", "6m0s", "20ms" or "2.5" into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    def __init__(self, capacity, period):
+        # The configured limit is a ceiling headers can lower but never raise
+        self.max_capacity = capacity
+        self.period = period
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost, now):
+        self.refill(now)
+        # A single request larger than the bucket still goes once it is full
+        cost = min(cost, self.capacity)
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def consume(self, cost):
+        self.tokens -= min(cost, self.capacity)
+
+    def sync(self, limit, remaining, reset, window):
+        """
+        Adopts the provider's view from response headers counted over window
+        seconds, and returns how long to hold off because the window is used up.
+
+        Only a limit over the bucket's own period changes its rate, in either
+        direction but never above the configured limit. Limits over longer
+        windows, such as requests per day, are enforced through remaining
+        and reset alone, so they do not throttle bursts.
+        """
+        now = time.monotonic()
+        self.refill(now)
+        if limit and window == self.period:
+            self.capacity = min(self.max_capacity, limit)
+            self.rate = self.capacity / self.period
+            self.tokens = min(self.tokens, self.capacity)
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+        if remaining is not None and remaining < 1 and reset:
+            return reset
+        return 0.0
+
+
+class ProviderState:
+    def __init__(self, provider):
+        rpm, audio_per_hour = DEFAULT_LIMITS.get(provider, (60, None))
+        self.requests = TokenBucket(rpm, 60)
+        self.audio = TokenBucket(audio_per_hour, 3600) if audio_per_hour else None
+        self.blocked_until = 0.0
+        self.queue = []
+
+    def wait_time(self, audio_seconds, now):
+        wait = max(self.blocked_until - now, self.requests.wait_time(1, now))
+        if self.audio is not None and audio_seconds:
+            wait = max(wait, self.audio.wait_time(audio_seconds, now))
+        return wait
+
+    def consume(self, audio_seconds):
+        self.requests.consume(1)
+        if self.audio is not None and audio_seconds:
+            self.audio.consume(audio_seconds)
+
+
+class RequestScheduler:
+    """
+    Token-bucket scheduler shared by every request whis sends to a provider.
+
+    Requests queue per provider ordered by priority, then arrival, so
+    interactive dictation overtakes queued batch work. Buckets are capped at
+    DEFAULT_LIMITS and follow the x-ratelimit-* headers of each response.
+    Callers block while they wait, so never call this on the main thread.
+    """
+
+    WAIT_SAMPLES = 200
+
+    _default = None
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.providers = {}
+        self.sequence = itertools.count()
+        self.waits = deque(maxlen=self.WAIT_SAMPLES)
+        self.throttled = 0
+        self.retries = 0
+
+    @classmethod
+    def get_default(cls):
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def get_state(self, provider):
+        state = self.providers.get(provider)
+        if state is None:
+            state = self.providers[provider] = ProviderState(provider)
+        return state
+
+    def acquire(self, provider, priority=PRIORITY_INTERACTIVE, audio_seconds=None):
+        """Blocks until provider has capacity and this request is next in line."""
+        start = time.monotonic()
+        with self.condition:
+            state = self.get_state(provider)
+            entry = (priority, next(self.sequence))
+            heapq.heappush(state.queue, entry)
+            try:
+                while True:
+                    if state.queue[0] == entry:
+                        wait = state.wait_time(audio_seconds, time.monotonic())
+                        if wait <= 0:
+                            break
+                        self.condition.wait(wait)
+                    else:
+                        self.condition.wait()
+                heapq.heappop(state.queue)
+                state.consume(audio_seconds)
+                waited = time.monotonic() - start
+                self.waits.append(waited)
+            except BaseException:
+                state.queue.remove(entry)
+                heapq.heapify(state.queue)
+                raise
+            finally:
+                self.condition.notify_all()
+        if waited > 1:
+            logger.debug(f"{provider} request waited {waited:.1f}s for rate limit (priority {priority})")
+
+    def update(self, provider, headers):
+        """Syncs the buckets with x-ratelimit-* response headers."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        windows = HEADER_WINDOWS.get(provider, {})
+        with self.condition:
+            state = self.get_state(provider)
+            for suffix, bucket in (("requests", state.requests), ("audio-seconds", state.audio)):
+                if bucket is None or suffix not in windows or f"x-ratelimit-remaining-{suffix}" not in headers:
+                    continue
+                try:
+                    limit = int(headers.get(f"x-ratelimit-limit-{suffix}", 0)) or None
+                    remaining = float(headers[f"x-ratelimit-remaining-{suffix}"])
+                except ValueError:
+                    continue
+                reset = parse_reset(headers.get(f"x-ratelimit-reset-{suffix}", ""))
+                hold = bucket.sync(limit, remaining, reset, windows[suffix])
+                if hold:
+                    logger.warning(f"{provider} {suffix} limit used up, holding requests for {hold:.0f}s")
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + hold)
+            self.condition.notify_all()
+
+    def block(self, provider, seconds):
+        with self.condition:
+            state = self.get_state(provider)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+
+    def run(self, provider, request, priority=PRIORITY_INTERACTIVE, audio_seconds=None):
+        """
+        Calls request() under the rate limit, retrying throttled and transient
+        failures with jittered exponential backoff. request must return an
+        object with .headers or raise an exception with .status and .headers.
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            self.acquire(provider, priority, audio_seconds)
+            try:
+                result = request()
+            except Exception as e:
+                if not hasattr(e, "status"):
+                    raise
+                # No status means the request never got an answer, which is worth retrying
+                status = e.status
+                headers = e.headers or {}
+                if attempt == MAX_ATTEMPTS - 1 or not (status is None or status in RETRY_STATUSES):
+                    raise
+                self.update(provider, headers)
+                retry_after = parse_reset(headers.get("retry-after", headers.get("Retry-After", "")))
+                delay = retry_after if retry_after is not None else random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                if status == 429:
+                    self.throttled += 1
+                    # Everyone waits, not only this request
+                    self.block(provider, delay)
+                self.retries += 1
+                logger.warning(f"{provider} request failed ({status or e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.update(provider, getattr(result, "headers", None) or {})
+            return result
+
+    def stats(self):
+        with self.condition:
+            depth = {provider: len(state.queue) for provider, state in self.providers.items()}
+            waits = list(self.waits)
+        return {
+            "queue_depth": depth,
+            "wait_p50": percentile(waits, 50),
+            "wait_p95": percentile(waits, 95),
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        queued = ", ".join(f"{p} {n}" for p, n in s["queue_depth"].items()) or "none"
+        return (f"Queued: {queued} · wait p50 {s['wait_p50']:.1f}s p95 {s['wait_p95']:.1f}s · "
+                f"429s {s['throttled']} · retries {s['retries']}")
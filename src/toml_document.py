@@ -0,0 +1,289 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import json
+import re
+
+_BARE_KEY = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def format_value(val):
+    """Formats a Python value as a TOML literal."""
+    if isinstance(val, bool):
+        return "true" if val else "false"
+    elif isinstance(val, (int, float)):
+        return str(val)
+    elif isinstance(val, (list, tuple)):
+        return "[" + ", ".join(format_value(v) for v in val) + "]"
+    elif isinstance(val, dict):
+        return "{ " + ", ".join(f"{format_key(k)} = {format_value(v)}" for k, v in val.items()) + " }"
+    else:
+        return json.dumps(str(val), ensure_ascii=False)
+
+
+def format_key(key):
+    return key if _BARE_KEY.fullmatch(key) else json.dumps(key, ensure_ascii=False)
+
+
+def split_dotted(name):
+    """Splits a dotted table or key name into its parts, honouring quotes."""
+    parts, _ = _parse_key_parts(name, 0, "")
+    return parts
+
+
+def _parse_key_parts(line, pos, terminators):
+    """
+    Parses a (possibly dotted, possibly quoted) key starting at pos.
+    Returns (parts, position of the terminating character).
+    """
+    parts = []
+    n = len(line)
+    while True:
+        while pos < n and line[pos] in " \t":
+            pos += 1
+        if pos < n and line[pos] in "\"'":
+            quote = line[pos]
+            end = pos + 1
+            while end < n and line[end] != quote:
+                end += 2 if quote == '"' and line[end] == "\\" else 1
+            raw = line[pos:end + 1]
+            parts.append(json.loads(raw) if quote == '"' else raw[1:-1])
+            pos = end + 1
+        else:
+            match = _BARE_KEY.match(line, pos)
+            if not match:
+                return None, pos
+            parts.append(match.group())
+            pos = match.end()
+        while pos < n and line[pos] in " \t":
+            pos += 1
+        if pos < n and line[pos] == ".":
+            pos += 1
+            continue
+        if pos >= n or line[pos] in terminators:
+            return tuple(parts), pos
+        return None, pos
+
+
+def _scan_value(line, pos, quote, depth):
+    """
+    Scans part of a value on one line, carrying string/bracket state across lines.
+    Returns (quote, depth, end) where end is the column just past the last value
+    character on this line, excluding whitespace and any trailing comment.
+    """
+    n = len(line)
+    end = pos
+    i = pos
+    while i < n:
+        c = line[i]
+        if quote:
+            if c == "\\" and quote[0] == '"':
+                i += 2
+                continue
+            if line.startswith(quote, i):
+                i += len(quote)
+                # A multi-line string may close with up to two extra quotes
+                while len(quote) == 3 and i < n and line[i] == quote[0]:
+                    i += 1
+                quote = None
+                end = i
+                continue
+            i += 1
+            end = i
+            continue
+        if c == "#":
+            break
+        if c in "\"'":
+            quote = c * 3 if line.startswith(c * 3, i) else c
+            i += len(quote)
+            continue
+        if c in "[{":
+            depth += 1
+        elif c in "]}":
+            depth -= 1
+        if not c.isspace():
+            end = i + 1
+        i += 1
+    if quote and len(quote) == 1:
+        # Single-line strings cannot continue onto the next line
+        quote = None
+    return quote, depth, end
+
+
+class TomlDocument:
+    """
+    Round-trip editor for a TOML file.
+
+    The document is indexed in a single pass into key -> line span and
+    table -> insertion anchor maps, so updates only rewrite the value text of
+    the affected keys. Comments, ordering and formatting are left untouched.
+    """
+
+    def __init__(self, text):
+        self.lines = text.splitlines(keepends=True)
+        self._reindex()
+
+    def dumps(self):
+        return "".join(self.lines)
+
+    def get_span(self, section, key):
+        """Returns (first line, last line) of a key's assignment or None."""
+        span = self._keys.get(split_dotted(section) + (key,) if section else (key,))
+        return (span[0], span[1]) if span else None
+
+    def _reindex(self):
+        # full key path -> [start_line, end_line, value_col, value_end_col]
+        self._keys = {}
+        # table path -> line after which new keys for the table are inserted
+        self._tables = {(): -1}
+        # table path defined only by dotted keys -> (dotted prefix, span of its last key)
+        self._dotted = {}
+        self._array_tables = set()
+
+        table = ()
+        open_key = None
+        quote, depth = None, 0
+
+        for idx, line in enumerate(self.lines):
+            if open_key is not None:
+                # Continuation of a multi-line array, inline table or string
+                quote, depth, end = _scan_value(line, 0, quote, depth)
+                open_key[1] = idx
+                open_key[3] = end
+                if not quote and depth <= 0:
+                    if table is not None:
+                        self._tables[table] = idx
+                    open_key = None
+                continue
+
+            pos = len(line) - len(line.lstrip())
+            if pos >= len(line) or line[pos] in "#\r\n":
+                continue
+
+            if line.startswith("[[", pos):
+                parts, end = _parse_key_parts(line, pos + 2, "]")
+                if parts is not None:
+                    self._array_tables.add(parts)
+                # Keys inside arrays of tables are not addressable by section name
+                table = None
+                continue
+
+            if line[pos] == "[":
+                parts, end = _parse_key_parts(line, pos + 1, "]")
+                table = parts
+                if parts is not None:
+                    self._tables[parts] = idx
+                continue
+
+            parts, eq = _parse_key_parts(line, pos, "=")
+            if parts is None:
+                continue
+            value_col = eq + 1
+            while value_col < len(line) and line[value_col] in " \t":
+                value_col += 1
+            quote, depth, end = _scan_value(line, value_col, None, 0)
+            span = [idx, idx, value_col, end]
+            if table is not None:
+                self._keys[table + parts] = span
+                self._tables[table] = idx
+                for i in range(1, len(parts)):
+                    self._dotted[table + parts[:i]] = (parts[:i], span)
+            if quote or depth > 0:
+                open_key = span
+
+    def update(self, updates):
+        """
+        Applies a dictionary of section -> key -> value in O(lines + updates).
+        Existing keys keep their indentation and trailing comments, missing keys
+        are added at the end of their table and missing tables are appended.
+        """
+        replacements = {}
+        inserts = {}
+        new_tables = {}
+
+        for section, values in updates.items():
+            table = split_dotted(section) if section else ()
+            if table is None:
+                raise ValueError(f"Invalid table name: {section!r}")
+            if table in self._array_tables:
+                raise ValueError(f"Cannot update array of tables: [[{section}]]")
+            for key, val in values.items():
+                span = self._keys.get(table + (key,))
+                val_str = format_value(val)
+                if span is not None:
+                    start, end, value_col, value_end = span
+                    replacements[start] = (end, self.lines[start][:value_col] + val_str + self.lines[end][value_end:])
+                elif table in self._tables:
+                    inserts.setdefault(self._tables[table], []).append(f"{format_key(key)} = {val_str}\n")
+                elif table in self._dotted:
+                    # A [table] header would redefine it, so add another dotted key next to the last one
+                    prefix, last = self._dotted[table]
+                    dotted = ".".join(format_key(part) for part in prefix + (key,))
+                    inserts.setdefault(last[1], []).append(f"{dotted} = {val_str}\n")
+                else:
+                    new_tables.setdefault(section, []).append(f"{format_key(key)} = {val_str}\n")
+
+        new_lines = list(inserts.get(-1, ()))
+        idx = 0
+        total = len(self.lines)
+        while idx < total:
+            if idx in replacements:
+                end, text = replacements[idx]
+                new_lines.append(text)
+            else:
+                end = idx
+                new_lines.append(self.lines[idx])
+            if end in inserts:
+                if not new_lines[-1].endswith("\n"):
+                    new_lines[-1] += "\n"
+                new_lines.extend(inserts[end])
+            idx = end + 1
+
+        for section, key_lines in new_tables.items():
+            if new_lines and not new_lines[-1].endswith("\n"):
+                new_lines[-1] += "\n"
+            new_lines.append(f"\n[{section}]\n")
+            new_lines.extend(key_lines)
+
+        self.lines = new_lines
+        self._reindex()
+
+
+if __name__ == "__main__":
+    # Benchmark: python3 src/toml_document.py
+    import time
+    import tomllib
+
+    sections = 400
+    body = ['# generated benchmark config\n', 'version = 1\n']
+    for s in range(sections):
+        body.append(f"\n[section{s}] # table comment\n")
+        body.append(f'name = "section {s}" # inline comment\n')
+        body.append(f"enabled = {'true' if s % 2 else 'false'}\n")
+        body.append(f"[section{s}.nested]\n")
+        body.append("items = [\n  1,\n  2, # comment\n]\n")
+        body.append(f'url = "http://example.com/{s}#frag"\n')
+    body.append("\n[[servers]]\nname = \"a\"\n")
+    body.insert(2, 'recording.device = "mic"\n')
+    text = "".join(body)
+
+    updates = {f"section{s}": {"enabled": True, "added": s} for s in range(0, sections, 8)}
+    updates["section3.nested"] = {"items": [4, 5], "url": "changed"}
+    updates["brand.new"] = {"key": "value"}
+    updates["recording"] = {"device": "usb", "gain": 2}
+
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        doc = TomlDocument(text)
+        doc.update(updates)
+        out = doc.dumps()
+    elapsed = (time.perf_counter() - start) / runs
+
+    parsed = tomllib.loads(out)
+    assert parsed["section3"]["nested"]["items"] == [4, 5]
+    assert parsed["section8"]["added"] == 8
+    assert parsed["brand"]["new"]["key"] == "value"
+    assert parsed["recording"] == {"device": "usb", "gain": 2}
+    assert out.count("# inline comment") == sections
+    print(f"{len(doc.lines)} lines, {sum(len(v) for v in updates.values())} updates: {elapsed * 1000:.2f} ms per parse+update")
@@ -0,0 +1,109 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import json
+import uuid
+import logging
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+
+from .scheduler import RequestScheduler, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = {
+    "openai": "https://api.openai.com/v1/audio/transcriptions",
+    "groq-transcription": "https://api.groq.com/openai/v1/audio/transcriptions",
+    "groq-translation": "https://api.groq.com/openai/v1/audio/translations",
+}
+
+# These models only return plain JSON without segment timings
+_JSON_ONLY_MODELS = ("gpt-4o-transcribe", "gpt-4o-mini-transcribe")
+
+_CONTENT_TYPES = {".flac": "audio/flac", ".ogg": "audio/ogg", ".opus": "audio/ogg", ".wav": "audio/wav", ".mp3": "audio/mpeg"}
+
+
+class TranscriptionError(Exception):
+    def __init__(self, message, status=None, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+@dataclass(slots=True)
+class TranscriptionResult:
+    text: str
+    # [{"start": seconds, "end": seconds, "text": str}]
+    segments: list = field(default_factory=list)
+    duration: float = None
+    headers: dict = field(default_factory=dict)
+
+
+class TranscriptionClient:
+    """Uploads audio files to the configured provider's Whisper-compatible API."""
+
+    TIMEOUT = 120
+
+    def __init__(self, provider, api_key, model, language=""):
+        if provider not in ENDPOINTS:
+            raise TranscriptionError(f"Unsupported provider: {provider}")
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.language = language
+
+    @classmethod
+    def from_config(cls, transcription):
+        """Creates a client from a config_schema.TranscriptionConfig."""
+        synced = transcription.synced()
+        return cls(synced.provider, synced.api_key, synced.model, synced.language)
+
+    def transcribe(self, path, priority=PRIORITY_INTERACTIVE, audio_seconds=None):
+        """Transcribes the file at path, waiting for the shared rate limit first."""
+        return RequestScheduler.get_default().run(
+            self.provider, lambda: self._request(path), priority, audio_seconds)
+
+    def _request(self, path):
+        fields = {"model": self.model}
+        if self.model not in _JSON_ONLY_MODELS:
+            fields["response_format"] = "verbose_json"
+        if self.language and self.provider != "groq-translation":
+            fields["language"] = self.language
+
+        with open(path, "rb") as f:
+            audio = f.read()
+        body, content_type = self._encode_multipart(fields, os.path.basename(path), audio)
+
+        request = urllib.request.Request(ENDPOINTS[self.provider], data=body, method="POST", headers={
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": content_type,
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.TIMEOUT) as response:
+                body = response.read()
+                headers = dict(response.headers)
+        except urllib.error.HTTPError as e:
+            raise TranscriptionError(f"{self.provider} returned {e.code}: {e.read()[:200]!r}", e.code, dict(e.headers)) from e
+        except (urllib.error.URLError, OSError) as e:
+            raise TranscriptionError(f"{self.provider} request failed: {e}") from e
+
+        try:
+            data = json.loads(body)
+            segments = [{"start": s["start"], "end": s["end"], "text": s["text"].strip()} for s in data.get("segments") or ()]
+            return TranscriptionResult(data.get("text", "").strip(), segments, data.get("duration"), headers)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise TranscriptionError(f"{self.provider} returned an unexpected response: {body[:200]!r}", headers=headers) from e
+
+    def _encode_multipart(self, fields, filename, payload):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in fields.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        content_type = _CONTENT_TYPES.get(os.path.splitext(filename)[1].lower(), "application/octet-stream")
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n'.encode())
+        parts.append(payload)
+        parts.append(f"\r\n--{boundary}--\r\n".encode())
+        return b"".join(parts), f"multipart/form-data; boundary={boundary}"
@@ -0,0 +1,262 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2025 Adi Hezral <hezral@gmail.com>
+
+import os
+import time
+import marshal
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached automaton layout changes
+CACHE_VERSION = 1
+SEPARATORS = ("=>", "->", "\t")
+
+
+def get_vocabulary_path():
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(config_home, "whis", "vocabulary.txt")
+
+
+def get_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "whis", "vocabulary.cache")
+
+
+def lower(text):
+    """Lowercases text without changing its length, so offsets stay valid."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def parse_vocabulary(lines):
+    """
+    Parses vocabulary lines into {lowercase pattern: replacement}.
+
+    A line is either "misspelling => Replacement" (also "->" or a tab), or
+    a bare term such as "GitHub", which fixes the casing of any match.
+    Blank lines and lines starting with # are ignored.
+    """
+    entries = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for separator in SEPARATORS:
+            if separator in line:
+                pattern, replacement = (part.strip() for part in line.split(separator, 1))
+                break
+        else:
+            pattern = replacement = line
+        if pattern:
+            entries[lower(pattern)] = replacement
+    return entries
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton over lowercase patterns.
+
+    Nodes are stored column-wise: goto[node] maps a character to the next
+    node, fail[node] is the failure link, out[node] the index of the pattern
+    ending at node (or -1), and link[node] the nearest node on the failure
+    chain that ends a pattern, so matches are enumerated without walking
+    every failure link.
+    """
+
+    def __init__(self, goto, fail, out, link, patterns):
+        self.goto = goto
+        self.fail = fail
+        self.out = out
+        self.link = link
+        # [(pattern length, replacement)]
+        self.patterns = patterns
+
+    @classmethod
+    def build(cls, entries):
+        goto, out, patterns = [{}], [-1], []
+        for pattern, replacement in entries.items():
+            node = 0
+            for char in pattern:
+                next_node = goto[node].get(char)
+                if next_node is None:
+                    next_node = goto[node][char] = len(goto)
+                    goto.append({})
+                    out.append(-1)
+                node = next_node
+            out[node] = len(patterns)
+            patterns.append((len(pattern), replacement))
+
+        fail = [0] * len(goto)
+        link = [-1] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0) if goto[state].get(char) != child else 0
+                link[child] = fail[child] if out[fail[child]] >= 0 else link[fail[child]]
+                queue.append(child)
+        return cls(goto, fail, out, link, patterns)
+
+    def replace(self, text):
+        """Applies all replacements in one pass, leftmost-longest, on whole words only."""
+        if not self.patterns or not text:
+            return text
+        lowered = lower(text)
+        size = len(lowered)
+        goto, fail, out, link, patterns = self.goto, self.fail, self.out, self.link, self.patterns
+        # start -> (end, replacement) of the longest match starting there
+        best = {}
+        node = 0
+        for end, char in enumerate(lowered, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            match = node if out[node] >= 0 else link[node]
+            while match > 0:
+                length, replacement = patterns[out[match]]
+                start = end - length
+                if ((start == 0 or not lowered[start].isalnum() or not lowered[start - 1].isalnum())
+                        and (end == size or not lowered[end - 1].isalnum() or not lowered[end].isalnum())):
+                    previous = best.get(start)
+                    if previous is None or previous[0] < end:
+                        best[start] = (end, replacement)
+                match = link[match]
+
+        if not best:
+            return text
+        pieces = []
+        position = 0
+        for start in sorted(best):
+            if start < position:
+                continue
+            end, replacement = best[start]
+            pieces.append(text[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+    def dumps(self, key):
+        return marshal.dumps((CACHE_VERSION, key, self.goto, self.fail, self.out, self.link, self.patterns))
+
+    @classmethod
+    def loads(cls, data, key):
+        """Returns the cached automaton, or None if it was built from another file version."""
+        version, cached_key, goto, fail, out, link, patterns = marshal.loads(data)
+        if version != CACHE_VERSION or tuple(cached_key) != tuple(key):
+            return None
+        return cls(goto, fail, out, link, patterns)
+
+
+class Vocabulary:
+    """
+    User vocabulary applied to transcripts before they are injected.
+
+    The compiled automaton is cached on disk next to the other whis caches
+    and only rebuilt when the vocabulary file's size or mtime changes. The
+    file is stat'ed before each use, so edits apply to the next dictation.
+    """
+
+    _default = None
+
+    def __init__(self, path=None, cache_path=None):
+        self.path = path or get_vocabulary_path()
+        self.cache_path = cache_path or get_cache_path()
+        self.key = None
+        self.automaton = Automaton.build({})
+
+    @classmethod
+    def get_default(cls):
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def get_key(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (self.path, stat.st_size, stat.st_mtime_ns)
+
+    def refresh(self):
+        key = self.get_key()
+        if key == self.key:
+            return
+        self.key = key
+        if key is None:
+            self.automaton = Automaton.build({})
+            return
+
+        start = time.perf_counter()
+        try:
+            with open(self.cache_path, "rb") as f:
+                automaton = Automaton.loads(f.read(), key)
+        except (OSError, ValueError, EOFError, TypeError):
+            automaton = None
+        if automaton is not None:
+            self.automaton = automaton
+            logger.debug(f"Loaded {len(automaton.patterns)} vocabulary entries from cache in "
+                         f"{(time.perf_counter() - start) * 1000:.1f}ms")
+            return
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = parse_vocabulary(f)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"Failed to read vocabulary {self.path}: {e}")
+            self.automaton = Automaton.build({})
+            return
+        self.automaton = Automaton.build(entries)
+        logger.info(f"Compiled {len(entries)} vocabulary entries in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self.automaton.dumps(key))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to cache vocabulary: {e}")
+
+    def apply(self, text):
+        self.refresh()
+        return self.automaton.replace(text)
+
+
+if __name__ == "__main__":
+    import random
+    import string
+    import tempfile
+
+    random.seed(1)
+    words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(4, 12))) for _ in range(10000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vocabulary.txt")
+        with open(path, "w") as f:
+            f.write("# test vocabulary\ngit hub => GitHub\nkubernetes\n")
+            f.writelines(f"{w} => {w.upper()}\n" for w in words)
+        vocabulary = Vocabulary(path, os.path.join(tmp, "vocabulary.cache"))
+
+        start = time.perf_counter()
+        vocabulary.refresh()
+        print(f"Build 10k entries: {(time.perf_counter() - start) * 1000:.0f}ms")
+        vocabulary.key = None
+        start = time.perf_counter()
+        vocabulary.refresh()
+        print(f"Load from cache: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        text = ("we pushed the fix to git hub and deployed it on Kubernetes "
+                + " ".join(random.choice(words) if random.random() < 0.1 else "dictated" for _ in range(30)))
+        print(vocabulary.apply(text)[:120])
+        runs = 1000
+        start = time.perf_counter()
+        for _ in range(runs):
+            vocabulary.apply(text)
+        print(f"Apply to {len(text)} chars: {(time.perf_counter() - start) / runs * 1e6:.0f}us")
@@ -2,20 +2,36 @@ import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Gdk', '4.0')
 gi.require_version('Gst', '1.0')
-from gi.repository import Gtk, Gdk, Gst, GLib, GObject
+from gi.repository import Gtk, Gdk, Gst, GLib, GObject, Gio
 import cairo
 import math
 import random
 import subprocess
 import os
+import time
 import logging
+from collections import deque
 
 from .preferences import PreferencesWindow
 from .logging_utils import log_function_calls
+from .frame_stats import FrameStats
+from .audio_devices import AudioDeviceMonitor
+from .config_manager import ConfigManager
+from .transcription import TranscriptionClient, TranscriptionError
+from .gst_utils import get_float_list
 
 # Initialize module-level logger
 logger = logging.getLogger(__name__)
 
+# Target seconds between level samples, i.e. between bars, and render caps
+METER_INTERVAL = 0.05
+LOW_POWER_METER_INTERVAL = 0.1
+MAX_RENDER_FPS = 60
+LOW_POWER_RENDER_FPS = 20
+# Spectrum magnitudes below this many dB are drawn as silence
+SPECTRUM_THRESHOLD = -80
+
+
 class whisWindow(Gtk.ApplicationWindow):
     __gtype_name__ = 'whisWindow'
 
@@ -24,16 +40,33 @@ class whisWindow(Gtk.ApplicationWindow):
         self.app = self.props.application
 
         # UI State
-        self.levels = [0.05] * 15
+        # (monotonic seconds, level) samples, interpolated at render time
+        self.samples = deque(maxlen=256)
+        self.sample_clock_offset = None
         self.last_audio_level = 0.0
         self.pipeline = None
+        self.source = None
+        self.convert = None
+        self.level = None
+        self.spectrum = None
+        self.spectrum_levels = []
         self.level_history = [-100.0] * 50
         self.sensitivity = 0.5
-        self.scroll_speed = 40
-        self.target_height = 24
-        self.current_height = 24
+        self.meter_interval = METER_INTERVAL
+        self.render_interval = 1 / MAX_RENDER_FPS
+        self.refresh_interval = None
+        self.render_time = 0.0
+        self.last_render = 0.0
+        self.render_tick_id = None
+        self.idle_source = None
         self.revealed = False
         self.recording = False
+        # Only allocated while the debug overlay is shown
+        self.frame_stats = None
+        self.frame_stats_sources = []
+        self.settings_handlers = []
+        self.transition_stats = None
+        self.transition_tick_id = None
 
         # Window Settings
         self.set_title("Whis")
@@ -51,15 +84,35 @@ class whisWindow(Gtk.ApplicationWindow):
         self.canvas = Gtk.DrawingArea()
         self.canvas.set_draw_func(self.on_draw)
         self.canvas.set_size_request(-1, 24)
+        self.stats_label = Gtk.Label()
+        self.stats_label.add_css_class("frame-stats")
+        self.stats_label.set_halign(Gtk.Align.START)
+        self.stats_label.set_valign(Gtk.Align.START)
+        self.stats_label.set_can_target(False)
+        self.stats_label.set_visible(False)
+        self.canvas_overlay = Gtk.Overlay()
+        self.canvas_overlay.set_child(self.canvas)
+        self.canvas_overlay.add_overlay(self.stats_label)
+        # One dot per built-in dictation job, coloured by state
+        self.jobs_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
+        self.jobs_box.set_halign(Gtk.Align.END)
+        self.jobs_box.set_valign(Gtk.Align.CENTER)
+        self.jobs_box.set_margin_end(6)
+        self.jobs_box.set_can_target(False)
+        self.canvas_overlay.add_overlay(self.jobs_box)
+        self.dictation_handler = self.app.dictation.connect("changed", self.on_dictation_changed)
         self.handle = Gtk.WindowHandle()
-        self.handle.set_child(self.canvas)
+        self.handle.set_child(self.canvas_overlay)
         self.main_box.append(self.handle)
 
         # Bottom Drawer (Buttons)
         self.revealer = Gtk.Revealer()
-        self.revealer.set_transition_type(Gtk.RevealerTransitionType.SLIDE_DOWN)
+        # Crossfade keeps the drawer's size constant, so the toplevel is only
+        # resized once when it is shown and once after it has faded out
+        self.revealer.set_transition_type(Gtk.RevealerTransitionType.CROSSFADE)
         self.revealer.set_transition_duration(300)
         self.revealer.set_visible(False)
+        self.revealer.connect("notify::child-revealed", self.on_drawer_revealed)
 
         self.btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
         self.btn_box.set_halign(Gtk.Align.CENTER)
@@ -123,6 +176,7 @@ class whisWindow(Gtk.ApplicationWindow):
         self.main_box.add_controller(motion_ctrl)
 
         self.set_child(self.main_box)
+        self.connect("close-request", self.on_window_close_request)
         self.setup_audio()
 
         # Keyboard shortcuts
@@ -130,8 +184,16 @@ class whisWindow(Gtk.ApplicationWindow):
         key_ctrl.connect("key-pressed", self.on_key_pressed)
         self.add_controller(key_ctrl)
 
-        # GLib timeout for animation
-        GLib.timeout_add(self.scroll_speed, self.update_animation)
+        # Follow the power profile so the meter slows down in power-saver mode
+        self.low_power = False
+        try:
+            self.power_monitor = Gio.PowerProfileMonitor.dup_default()
+            self.power_handler = self.power_monitor.connect("notify::power-saver-enabled", self.on_power_saver_changed)
+            self.low_power = self.power_monitor.get_power_saver_enabled()
+        except AttributeError:
+            self.power_monitor = None
+
+        self.update_render_clock()
 
     def get_asset_path(self, filename):
         # We'll use the assets folder in Project root for now
@@ -139,19 +201,87 @@ class whisWindow(Gtk.ApplicationWindow):
 
     @log_function_calls
     def setup_audio(self):
-        pipeline_str = "autoaudiosrc ! audioconvert ! level interval=50000000 ! fakesink"
         try:
-            self.pipeline = Gst.parse_launch(pipeline_str)
+            self.pipeline = Gst.Pipeline.new("meter")
+            self.source = AudioDeviceMonitor.get_default().create_source(self.app.gio_settings.get_string("audio-device"))
+            self.convert = Gst.ElementFactory.make("audioconvert", None)
+            self.level = Gst.ElementFactory.make("level", "level")
+            self.level.set_property("interval", int(self.meter_interval * Gst.SECOND))
+            # The FFT runs inside GStreamer and only posts band magnitudes in spectrum mode
+            self.spectrum = Gst.ElementFactory.make("spectrum", "spectrum")
+            self.spectrum.set_property("threshold", SPECTRUM_THRESHOLD)
+            self.spectrum.set_property("interval", int(self.meter_interval * Gst.SECOND))
+            self.spectrum.set_property("post-messages", self.app.gio_settings.get_string("visualizer-mode") == "spectrum")
+            sink = Gst.ElementFactory.make("fakesink", None)
+            for element in (self.source, self.convert, self.level, self.spectrum, sink):
+                self.pipeline.add(element)
+            self.source.link(self.convert)
+            self.convert.link(self.level)
+            self.level.link(self.spectrum)
+            self.spectrum.link(sink)
+
             bus = self.pipeline.get_bus()
             bus.add_signal_watch()
             bus.connect("message::element", self.on_level_message)
+            bus.connect("message::clock-lost", self.on_clock_lost)
             # Do not set to PLAYING here, wait for Record button
             self.pipeline.set_state(Gst.State.NULL)
         except Exception as e:
             print(f"Failed to setup audio: {e}")
+            return
+
+        self.settings_handlers = [
+            self.app.gio_settings.connect("changed::audio-device", self.on_audio_device_changed),
+            self.app.gio_settings.connect("changed::visualizer-mode", self.on_visualizer_mode_changed),
+        ]
+
+    def on_visualizer_mode_changed(self, settings, key):
+        self.spectrum_levels = []
+        self.spectrum.set_property("post-messages", settings.get_string(key) == "spectrum")
+
+    def on_audio_device_changed(self, settings, key):
+        self.switch_source(settings.get_string(key))
+
+    @log_function_calls
+    def switch_source(self, device_id):
+        """Swaps the input on the live pipeline, keeping the rest of it running."""
+        if self.pipeline is None:
+            return
+        new_source = AudioDeviceMonitor.get_default().create_source(device_id)
+        old_source = self.source
+
+        # Stop the old source before unlinking so it never pushes into a dead pad
+        old_source.set_state(Gst.State.NULL)
+        old_source.unlink(self.convert)
+        self.pipeline.remove(old_source)
+
+        self.pipeline.add(new_source)
+        new_source.link(self.convert)
+        new_source.sync_state_with_parent()
+        self.source = new_source
+        # Samples were placed on the old source's clock
+        self.reset_meter()
+        logger.info(f"Audio input switched to {device_id or 'system default'}")
+
+    def on_clock_lost(self, bus, message):
+        # The removed source provided the pipeline clock; going through PAUSED selects a new one
+        logger.debug("Pipeline clock lost, selecting a new one")
+        self.pipeline.set_state(Gst.State.PAUSED)
+        self.pipeline.set_state(Gst.State.PLAYING)
+        # Running-time does not line up with the samples taken on the old clock
+        self.reset_meter()
 
     def on_level_message(self, bus, message):
+        if message.get_structure().get_name() == "spectrum":
+            # Map every band to a bar in one pass, scaled from dB to 0..1
+            scale = -1 / SPECTRUM_THRESHOLD
+            self.spectrum_levels = [min(1.0, (m - SPECTRUM_THRESHOLD) * scale) + 0.05
+                                    for m in get_float_list(message.get_structure(), "magnitude")]
+            return
+
         if message.get_structure().get_name() == "level":
+            if self.frame_stats is not None:
+                self.frame_stats.on_level(time.monotonic())
             rms = message.get_structure().get_value("rms")
             avg_rms = sum(rms) / len(rms)
             self.level_history.pop(0)
@@ -161,39 +291,129 @@ class whisWindow(Gtk.ApplicationWindow):
             normalized = max(0, min(1, normalized))
             self.last_audio_level = self.last_audio_level * 0.4 + normalized * 0.6
 
-    def update_animation(self):
-        if abs(self.target_height - self.current_height) > 0.5:
-            self.current_height += (self.target_height - self.current_height) * 0.2
-            self.set_default_size(100, int(self.current_height))
-            self.set_default_size(100, 24)
-            self.canvas.queue_draw()
-
-        self.levels.pop(0)
-        jitter = random.uniform(0.01, 0.03)
-        new_val = (self.last_audio_level * 0.9) + jitter
-        self.levels.append(new_val)
+            # Place the sample by its buffer timestamp rather than its arrival time.
+            # The smallest observed offset is the one with the least bus latency.
+            running_time = message.get_structure().get_value("running-time") / Gst.SECOND
+            offset = GLib.get_monotonic_time() / 1e6 - running_time
+            if self.sample_clock_offset is None or offset < self.sample_clock_offset:
+                self.sample_clock_offset = offset
+            timestamp = running_time + self.sample_clock_offset
+            if self.samples:
+                # A smaller offset can place a sample before the one it follows
+                timestamp = max(timestamp, self.samples[-1][0])
+            jitter = random.uniform(0.01, 0.03)
+            self.samples.append((timestamp, self.last_audio_level * 0.9 + jitter))
+
+    def negotiate_rates(self):
+        """Picks a meter interval that is a whole number of display frames."""
+        refresh_interval = self.refresh_interval or 1 / 60
+        target = LOW_POWER_METER_INTERVAL if self.low_power else METER_INTERVAL
+        self.meter_interval = max(1, round(target / refresh_interval)) * refresh_interval
+        max_fps = LOW_POWER_RENDER_FPS if self.low_power else MAX_RENDER_FPS
+        self.render_interval = max(refresh_interval, 1 / max_fps)
+        if self.level is not None:
+            self.level.set_property("interval", int(self.meter_interval * Gst.SECOND))
+            self.spectrum.set_property("interval", int(self.meter_interval * Gst.SECOND))
+        if self.idle_source is not None:
+            GLib.source_remove(self.idle_source)
+            self.idle_source = GLib.timeout_add(int(self.meter_interval * 1000), self.on_idle_tick)
+        logger.debug(f"Meter interval {self.meter_interval * 1000:.1f}ms, render interval {self.render_interval * 1000:.1f}ms")
+
+    def on_power_saver_changed(self, monitor, pspec):
+        self.low_power = monitor.get_power_saver_enabled()
+        self.negotiate_rates()
+
+    def update_render_clock(self):
+        """
+        Renders from the frame clock at the display's refresh rate while
+        recording, and only at the meter rate while idle, so an idle pill
+        does not wake up for every display frame.
+        """
+        if self.recording:
+            if self.idle_source is not None:
+                GLib.source_remove(self.idle_source)
+                self.idle_source = None
+            if self.render_tick_id is None:
+                self.render_tick_id = self.canvas.add_tick_callback(self.on_canvas_tick)
+        else:
+            if self.render_tick_id is not None:
+                self.canvas.remove_tick_callback(self.render_tick_id)
+                self.render_tick_id = None
+            if self.idle_source is None:
+                self.idle_source = GLib.timeout_add(int(self.meter_interval * 1000), self.on_idle_tick)
+
+    def update_refresh_interval(self, frame_clock):
+        refresh_interval = frame_clock.get_refresh_info(0)[0] / 1e6
+        if refresh_interval and refresh_interval != self.refresh_interval:
+            self.refresh_interval = refresh_interval
+            self.negotiate_rates()
+
+    def on_idle_tick(self):
+        if not self.get_mapped():
+            return GLib.SOURCE_CONTINUE
+        frame_clock = self.canvas.get_frame_clock()
+        if frame_clock is not None:
+            self.update_refresh_interval(frame_clock)
+        # Idle shimmer, on the monotonic clock recorded samples are placed on as well
+        now = GLib.get_monotonic_time() / 1e6
+        self.samples.append((now, random.uniform(0.01, 0.03)))
+        self.render_time = now - self.meter_interval
         self.canvas.queue_draw()
-        return True
+        return GLib.SOURCE_CONTINUE
+
+    def on_canvas_tick(self, widget, frame_clock):
+        self.update_refresh_interval(frame_clock)
+
+        # Frame times share the monotonic clock with the samples
+        now = frame_clock.get_frame_time() / 1e6
+        if now - self.last_render >= self.render_interval - 0.001:
+            self.last_render = now
+            # Render one interval behind so there is always a newer sample to blend towards
+            self.render_time = now - self.meter_interval
+            self.canvas.queue_draw()
+        return GLib.SOURCE_CONTINUE
+
+    def sample_levels(self, num_bars):
+        """Returns bar levels, oldest first, interpolated at meter_interval steps."""
+        samples = list(self.samples)
+        levels = [0.05] * num_bars
+        if not samples:
+            return levels
+        j = len(samples) - 1
+        for k in range(num_bars):
+            t = self.render_time - k * self.meter_interval
+            if t >= samples[-1][0]:
+                value = samples[-1][1]
+            else:
+                while j > 0 and samples[j - 1][0] > t:
+                    j -= 1
+                if j == 0:
+                    break
+                (t0, v0), (t1, v1) = samples[j - 1], samples[j]
+                value = v0 + (v1 - v0) * (t - t0) / (t1 - t0) if t1 > t0 else v1
+            levels[num_bars - 1 - k] = value
+        return levels
 
     def on_draw(self, drawing_area, cr, width, height):
+        start_time = time.perf_counter() if self.frame_stats is not None else None
         cr.set_source_rgba(0, 0, 0, 0)
         cr.paint()
         thickness, gap, margin = 2, 2, 5
         usable_width = width - 2 * margin
         usable_height = height - 2 * margin
         num_bars = int((usable_width + gap) // (thickness + gap))
-        
-        if len(self.levels) != num_bars:
-            if len(self.levels) < num_bars:
-                self.levels = [0.05] * (num_bars - len(self.levels)) + self.levels
-            else:
-                self.levels = self.levels[-num_bars:]
+        if self.spectrum is not None and self.spectrum.get_property("bands") != num_bars:
+            self.spectrum.set_property("bands", num_bars)
+        if self.recording and len(self.spectrum_levels) == num_bars:
+            levels = self.spectrum_levels
+        else:
+            levels = self.sample_levels(num_bars)
 
         total_bars_width = (num_bars * thickness) + ((num_bars - 1) * gap)
         start_x = margin + (usable_width - total_bars_width) / 2
         mid_y = height / 2
 
-        for i, level in enumerate(self.levels):
+        for i, level in enumerate(levels):
             x = start_x + (i * (thickness + gap)) + (thickness / 2)
             bar_height = (level * self.sensitivity * (usable_height - 2)) + 2
             cr.set_source_rgba(1, 1, 1, 0.5)
@@ -203,12 +423,49 @@ class whisWindow(Gtk.ApplicationWindow):
             cr.line_to(x, mid_y + bar_height / 2)
             cr.stroke()
 
+        if start_time is not None:
+            self.frame_stats.on_draw(time.perf_counter() - start_time)
+
     def on_window_clicked(self, gesture, n_press, x, y):
+        if self.revealed:
+            return
         self.revealed = True
-        self.target_height = 48
+        self.begin_transition_stats()
         self.revealer.set_visible(True)
         self.revealer.set_reveal_child(True)
 
+    def on_window_close_request(self, window):
+        # Hide rather than destroy; the application releases the UI after idling
+        self.set_visible(False)
+        self.app.schedule_teardown()
+        return True
+
+    def release(self):
+        """Drops the pipeline and the handlers that would keep this window alive."""
+        if self.dictation_handler is not None:
+            self.app.dictation.disconnect(self.dictation_handler)
+            self.dictation_handler = None
+        for handler in self.settings_handlers:
+            self.app.gio_settings.disconnect(handler)
+        self.settings_handlers = []
+        if self.power_monitor is not None:
+            self.power_monitor.disconnect(self.power_handler)
+            self.power_monitor = None
+        if self.frame_stats is not None:
+            self.toggle_frame_stats()
+        if self.pipeline is not None:
+            self.pipeline.set_state(Gst.State.NULL)
+            self.pipeline.get_bus().remove_signal_watch()
+            self.pipeline = None
+            self.source = self.convert = self.level = self.spectrum = None
+        if self.render_tick_id is not None:
+            self.canvas.remove_tick_callback(self.render_tick_id)
+            self.render_tick_id = None
+        if self.idle_source is not None:
+            GLib.source_remove(self.idle_source)
+            self.idle_source = None
+        self.reset_meter()
+
     def on_close_request(self, btn):
         self.close()
         self.app.quit()
@@ -216,9 +473,31 @@ class whisWindow(Gtk.ApplicationWindow):
     def on_hover_leave(self, ctrl):
         if self.revealed:
             self.revealed = False
-            self.target_height = 24
+            self.begin_transition_stats()
             self.revealer.set_reveal_child(False)
-            self.revealer.set_visible(False)
+
+    def on_drawer_revealed(self, revealer, pspec):
+        # Collapse the window only once the fade-out has finished
+        if not revealer.get_child_revealed() and not self.revealed:
+            revealer.set_visible(False)
+            self.set_default_size(100, 24)
+        self.end_transition_stats()
+
+    def begin_transition_stats(self):
+        if self.transition_tick_id is None:
+            self.transition_stats = FrameStats()
+            self.transition_tick_id = self.add_tick_callback(self.on_transition_tick)
+
+    def on_transition_tick(self, widget, frame_clock):
+        refresh_interval, _ = frame_clock.get_refresh_info(0)
+        self.transition_stats.on_frame(frame_clock.get_frame_time() / 1e6, refresh_interval / 1e6)
+        return GLib.SOURCE_CONTINUE
+
+    def end_transition_stats(self):
+        if self.transition_tick_id is not None:
+            self.remove_tick_callback(self.transition_tick_id)
+            self.transition_tick_id = None
+            logger.debug(f"Drawer transition: {self.transition_stats.format_summary()}")
 
     @log_function_calls
     def on_record_clicked(self, btn):
@@ -227,7 +506,15 @@ class whisWindow(Gtk.ApplicationWindow):
     def on_stop_clicked(self, btn):
         self.toggle_recording()
 
+    def uses_builtin_dictation(self):
+        return self.app.gio_settings.get_string("dictation-engine") == "whis"
+
     def cancel_recording(self):
+        if self.uses_builtin_dictation():
+            self.app.dictation.cancel()
+            self.set_recording(False)
+            return
+
         try:
             result = subprocess.run(["hyprvoice", "cancel"], capture_output=True, text=True, check=False)
             if result.stdout:
@@ -238,16 +525,14 @@ class whisWindow(Gtk.ApplicationWindow):
             logging.error(f"Failed to run hyprvoice cancel: {e}")
 
         # Stop UI and audio pipeline
-        self.recording = False
-        if self.pipeline:
-            self.pipeline.set_state(Gst.State.NULL)
-        
-        # Reset UI immediately
-        self.record_btn.set_visible(True)
-        self.stop_btn.set_visible(False)
+        self.set_recording(False)
 
     @log_function_calls
     def toggle_recording(self):
+        if self.uses_builtin_dictation():
+            self.toggle_dictation()
+            return
+
         try:
             result = subprocess.run(["hyprvoice", "toggle"], capture_output=True, text=True, check=False)
             if result.stdout:
@@ -257,9 +542,38 @@ class whisWindow(Gtk.ApplicationWindow):
         except Exception as e:
             logger.error(f"Failed to run hyprvoice toggle: {e}")
 
-        self.recording = not self.recording
-        
         if self.recording:
+            self.app.daemon.dictation_stopped()
+        self.set_recording(not self.recording)
+
+    def toggle_dictation(self):
+        # Stopping hands the job to the queue, so the next toggle can start recording right away
+        dictation = self.app.dictation
+        if dictation.is_recording():
+            dictation.stop()
+        else:
+            try:
+                client = TranscriptionClient.from_config(ConfigManager.get_default().get_settings().transcription)
+            except TranscriptionError as e:
+                logger.error(f"Cannot start dictation: {e}")
+                return
+            dictation.start(client, self.app.gio_settings.get_string("audio-device"))
+        self.set_recording(dictation.is_recording())
+
+    def reset_meter(self):
+        """Forgets levels and the clock offset; running-time restarts at 0 with the pipeline."""
+        self.last_audio_level = 0.0
+        self.samples.clear()
+        self.sample_clock_offset = None
+        self.spectrum_levels = []
+
+    def set_recording(self, recording):
+        self.recording = recording
+        self.update_render_clock()
+
+        if self.recording:
+            # Idle shimmer must not precede the first recorded sample
+            self.reset_meter()
             if self.pipeline:
                 self.pipeline.set_state(Gst.State.PLAYING)
             self.record_btn.set_visible(False)
@@ -268,20 +582,73 @@ class whisWindow(Gtk.ApplicationWindow):
             if self.pipeline:
                 self.pipeline.set_state(Gst.State.NULL)
             # Reset levels immediately for a clean stop
-            self.last_audio_level = 0.0
-            self.levels = [0.05] * len(self.levels)
+            self.reset_meter()
             self.record_btn.set_visible(True)
             self.stop_btn.set_visible(False)
 
+    def on_dictation_changed(self, dictation):
+        child = self.jobs_box.get_first_child()
+        while child is not None:
+            self.jobs_box.remove(child)
+            child = self.jobs_box.get_first_child()
+        for job in dictation.jobs:
+            dot = Gtk.Label(label="●")
+            dot.add_css_class("dictation-job")
+            dot.add_css_class(f"job-{job.state}")
+            dot.set_tooltip_text(f"Dictation {job.number}: {job.state}")
+            self.jobs_box.append(dot)
+
     def on_preferences_clicked(self, btn):
-        win = PreferencesWindow(self)
-        win.present()
+        # One instance per application, hidden on close and refreshed from the config cache
+        if self.app.preferences_window is None:
+            self.app.preferences_window = PreferencesWindow(self)
+        else:
+            self.app.preferences_window.set_transient_for(self)
+            self.app.preferences_window.refresh()
+        self.app.preferences_window.present()
 
     def on_key_pressed(self, controller, keyval, keycode, state):
         # Ctrl+E to open preferences
         if keyval == Gdk.KEY_e and (state & Gdk.ModifierType.CONTROL_MASK):
             self.on_preferences_clicked(None)
             return True
+        # Ctrl+D to toggle the frame timing overlay
+        if keyval == Gdk.KEY_d and (state & Gdk.ModifierType.CONTROL_MASK):
+            self.toggle_frame_stats()
+            return True
         return False
 
+    def toggle_frame_stats(self):
+        if self.frame_stats is None:
+            self.frame_stats = FrameStats()
+            self.frame_stats_sources = [
+                GLib.timeout_add(500, self.on_frame_stats_refresh),
+                GLib.timeout_add_seconds(10, self.on_frame_stats_export),
+            ]
+            self.frame_tick_id = self.canvas.add_tick_callback(self.on_frame_tick)
+            self.stats_label.set_visible(True)
+        else:
+            self.on_frame_stats_export()
+            self.canvas.remove_tick_callback(self.frame_tick_id)
+            for source in self.frame_stats_sources:
+                GLib.source_remove(source)
+            self.frame_stats_sources = []
+            self.frame_stats = None
+            self.stats_label.set_visible(False)
+
+    def on_frame_tick(self, widget, frame_clock):
+        refresh_interval, _ = frame_clock.get_refresh_info(0)
+        self.frame_stats.on_frame(frame_clock.get_frame_time() / 1e6, refresh_interval / 1e6)
+        return GLib.SOURCE_CONTINUE
+
+    def on_frame_stats_refresh(self):
+        s = self.frame_stats.summary()
+        self.stats_label.set_text(f"p95 {s['frame_p95_ms']:.0f}ms draw {s['draw_max_ms']:.1f}ms "
+                                  f"lvl {s['level_hz']:.0f}Hz drop {s['dropped']}")
+        return GLib.SOURCE_CONTINUE
+
+    def on_frame_stats_export(self):
+        logger.info(f"Frame stats: {self.frame_stats.format_summary()}")
+        return GLib.SOURCE_CONTINUE
+
         